@@ -0,0 +1,181 @@
+"""Columnar history of the CoinGecko coin universe.
+
+Each day's /coins/markets pages are stored as one Parquet snapshot,
+raw/coins_universe/{date}.parquet: one row per coin with its rank (position
+in market-cap order) and every market field. coin_id is dictionary-encoded.
+A small index, raw/coins_universe_index.parquet, holds one row per ID ever
+seen with its first and last snapshot date.
+
+Lookups read only what they need — the index for "ever seen" and first/last
+seen, a single day's file for "top N on date D" — so they stay cheap however
+many years of history accumulate.
+"""
+
+import json
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from subsets_utils import save_raw_parquet, load_raw_parquet, load_raw_json, list_raw_files, raw_asset_exists
+
+INDEX_ASSET = "coins_universe_index"
+
+_FLOAT_FIELDS = [
+    "current_price", "market_cap", "fully_diluted_valuation", "total_volume",
+    "high_24h", "low_24h", "price_change_24h", "price_change_percentage_24h",
+    "market_cap_change_24h", "market_cap_change_percentage_24h",
+    "circulating_supply", "total_supply", "max_supply",
+    "ath", "ath_change_percentage", "atl", "atl_change_percentage",
+]
+_STRING_FIELDS = ["symbol", "name", "image", "ath_date", "atl_date", "last_updated"]
+
+SNAPSHOT_SCHEMA = pa.schema(
+    [
+        ("date", pa.string()),
+        ("rank", pa.int32()),
+        ("coin_id", pa.dictionary(pa.int32(), pa.string())),
+        ("market_cap_rank", pa.int32()),
+    ]
+    + [(f, pa.string()) for f in _STRING_FIELDS]
+    + [(f, pa.float64()) for f in _FLOAT_FIELDS]
+    + [("roi", pa.string())]  # nested object, kept as JSON
+)
+
+INDEX_SCHEMA = pa.schema([
+    ("coin_id", pa.string()),
+    ("first_seen", pa.string()),
+    ("last_seen", pa.string()),
+])
+
+
+def _asset(date: str) -> str:
+    return f"coins_universe/{date}"
+
+
+def _snapshot_table(date: str, coins: list[dict]) -> pa.Table:
+    """Markets payload → snapshot table. Pages can repeat a coin when ranks shift; first wins."""
+    rows = {}
+    for c in coins:
+        rows.setdefault(c["id"], c)
+    coins = list(rows.values())
+    columns = {
+        "date": pa.array([date] * len(coins), pa.string()),
+        "rank": pa.array(range(1, len(coins) + 1), pa.int32()),
+        "coin_id": pa.array(list(rows), pa.string()).dictionary_encode(),
+        "market_cap_rank": pa.array([c.get("market_cap_rank") for c in coins], pa.int32()),
+    }
+    for f in _STRING_FIELDS:
+        columns[f] = pa.array([c.get(f) for c in coins], pa.string())
+    for f in _FLOAT_FIELDS:
+        columns[f] = pa.array([c.get(f) for c in coins], pa.float64())
+    columns["roi"] = pa.array(
+        [json.dumps(c["roi"]) if c.get("roi") is not None else None for c in coins], pa.string()
+    )
+    return pa.table(columns, schema=SNAPSHOT_SCHEMA)
+
+
+def _load_index() -> dict[str, list[str]]:
+    if not raw_asset_exists(INDEX_ASSET):
+        return {}
+    index = load_raw_parquet(INDEX_ASSET)
+    return {
+        coin_id: [first, last]
+        for coin_id, first, last in zip(*(index.column(c).to_pylist() for c in INDEX_SCHEMA.names))
+    }
+
+
+def _save_index(index: dict[str, list[str]]) -> None:
+    ids = sorted(index)
+    save_raw_parquet(pa.table({
+        "coin_id": ids,
+        "first_seen": [index[i][0] for i in ids],
+        "last_seen": [index[i][1] for i in ids],
+    }, schema=INDEX_SCHEMA), INDEX_ASSET)
+
+
+def _see(index: dict[str, list[str]], coin_ids, date: str) -> None:
+    for coin_id in coin_ids:
+        seen = index.setdefault(coin_id, [date, date])
+        seen[0] = min(seen[0], date)
+        seen[1] = max(seen[1], date)
+
+
+# =============================================================================
+# Writes
+# =============================================================================
+
+def save_snapshot(date: str, coins: list[dict]) -> int:
+    """Store one day's markets payload and fold its IDs into the index. Returns IDs ever seen."""
+    table = _snapshot_table(date, coins)
+    save_raw_parquet(table, _asset(date))
+    index = _load_index()
+    _see(index, pc.cast(table.column("coin_id"), pa.string()).to_pylist(), date)
+    _save_index(index)
+    return len(index)
+
+
+def has_index() -> bool:
+    return raw_asset_exists(INDEX_ASSET)
+
+
+def migrate_legacy(state: dict) -> int:
+    """One-off import of the JSON-era history: coins/{date}.json snapshots and
+    the `all_coin_ids` / `last_seen` lists from coins state.
+
+    IDs only known from state get their recorded last_seen (or the state's
+    last_date) as both first and last seen. The JSON files are left in place.
+    Returns the number of IDs in the new index.
+    """
+    index = {}
+    for path in list_raw_files("coins/*.json*"):
+        date = path.rsplit("/", 1)[-1].split(".", 1)[0]
+        table = _snapshot_table(date, load_raw_json(f"coins/{date}")["coins"])
+        save_raw_parquet(table, _asset(date))
+        _see(index, pc.cast(table.column("coin_id"), pa.string()).to_pylist(), date)
+
+    last_seen = state.get("last_seen", {})
+    fallback = state.get("last_date")
+    for coin_id in state.get("all_coin_ids", []):
+        if coin_id not in index and (last_seen.get(coin_id) or fallback):
+            _see(index, [coin_id], last_seen.get(coin_id) or fallback)
+
+    if index:
+        _save_index(index)
+    return len(index)
+
+
+# =============================================================================
+# Lookups
+# =============================================================================
+
+def snapshot_dates() -> list[str]:
+    """Dates (YYYY-MM-DD, ascending) with a stored snapshot."""
+    return [p.rsplit("/", 1)[-1].split(".", 1)[0] for p in list_raw_files("coins_universe/*.parquet")]
+
+
+def load_snapshot(date: str, columns: list[str] | None = None) -> pa.Table:
+    """One day's snapshot, rank order. Raises FileNotFoundError if there is none."""
+    table = load_raw_parquet(_asset(date))
+    return table.select(columns) if columns else table
+
+
+def latest_snapshot(columns: list[str] | None = None) -> pa.Table | None:
+    """Most recent snapshot, or None before the first one."""
+    dates = snapshot_dates()
+    return load_snapshot(dates[-1], columns) if dates else None
+
+
+def ids_ever_seen() -> list[str]:
+    """Every coin ID that has appeared in any snapshot, sorted."""
+    return sorted(_load_index())
+
+
+def ids_in_top_n(date: str, n: int) -> list[str]:
+    """IDs ranked 1..n on `date`, in rank order."""
+    table = load_snapshot(date, ["rank", "coin_id"])
+    top = table.filter(pc.less_equal(table.column("rank"), n))
+    return pc.cast(top.column("coin_id"), pa.string()).to_pylist()
+
+
+def first_last_seen() -> dict[str, tuple[str, str]]:
+    """coin_id → (first, last) snapshot date it appeared in."""
+    return {coin_id: (first, last) for coin_id, (first, last) in _load_index().items()}
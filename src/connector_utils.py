@@ -1,8 +1,13 @@
 """CoinGecko API client with rate limiting and retry logic."""
 
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
 import httpx
 from subsets_utils import get
-from ratelimit import limits, sleep_and_retry
+from subsets_utils.http_client import cached
+from subsets_utils.rate_limit import AdaptiveTokenBucket, parse_retry_after
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
 
 
@@ -20,22 +25,117 @@ def should_retry(exception):
     return False
 
 
-# CoinGecko public API: 5-15 calls/minute, but free tier is more restricted
-# Use 3 calls/minute to be very conservative and avoid 429s
-@sleep_and_retry
-@limits(calls=3, period=60)
+# CoinGecko public API: 5-15 calls/minute depending on load, and the limit
+# isn't published per key. Start at COINGECKO_CALLS_PER_MINUTE and let the
+# bucket adapt (AIMD): creep up while calls succeed, halve on a 429, never
+# below MIN or above MAX. Paid keys raise the ceiling.
+CALLS_PER_MINUTE = float(os.environ.get("COINGECKO_CALLS_PER_MINUTE", "5"))
+MIN_CALLS_PER_MINUTE = float(os.environ.get("COINGECKO_MIN_CALLS_PER_MINUTE", "1"))
+MAX_CALLS_PER_MINUTE = float(os.environ.get("COINGECKO_MAX_CALLS_PER_MINUTE", "30"))
+
+# Pause used when a 429 carries no Retry-After: the free tier's window is a minute.
+DEFAULT_RETRY_AFTER_S = 60.0
+
+# Requests kept in flight by fetch_concurrent(). All of them draw from the
+# same bucket, so this hides latency without raising the call rate.
+CONCURRENCY = int(os.environ.get("COINGECKO_CONCURRENCY", "4"))
+
+# One bucket for every caller — threads included, and every node process the
+# orchestrator forks after importing this module (DAG_PARALLELISM > 1).
+_bucket = AdaptiveTokenBucket(
+    calls=min(max(CALLS_PER_MINUTE, MIN_CALLS_PER_MINUTE), MAX_CALLS_PER_MINUTE),
+    period=60,
+    min_calls=MIN_CALLS_PER_MINUTE,
+    max_calls=MAX_CALLS_PER_MINUTE,
+    name="coingecko",
+    shared=True,
+)
+
+
+# Each attempt (retries included) takes its own token from the bucket. The
+# bucket does the waiting after a 429 (Retry-After), so tenacity only adds a
+# short backoff for network errors and 5xx.
 @retry(
     stop=stop_after_attempt(10),
-    wait=wait_exponential(multiplier=2, min=10, max=120),
+    wait=wait_exponential(multiplier=1, min=1, max=30),
     retry=retry_if_exception(should_retry),
     reraise=True
 )
 def rate_limited_get(url, params=None):
+    # Fresh responses from the HTTP cache (HTTP_CACHE_DIR) cost no token
+    response = cached(url, params=params)
+    if response is not None:
+        return response
+    _bucket.acquire()
     response = get(url, params=params)
+    if response.extensions.get("cache") is not None:
+        # Answered by the cache after all (304, or another thread stored it)
+        _bucket.refund()
+        return response
     if response.status_code == 404:
+        _bucket.on_success()
         raise CoinNotFoundError(f"Coin not found (404)")
     if response.status_code == 429:
+        retry_after = parse_retry_after(response.headers.get("retry-after"))
+        _bucket.on_throttle(retry_after if retry_after is not None else DEFAULT_RETRY_AFTER_S)
         raise httpx.HTTPStatusError(f"Rate limited", request=response.request, response=response)
     if response.status_code != 200:
         raise httpx.HTTPStatusError(f"API request failed with status {response.status_code}", request=response.request, response=response)
+    _bucket.on_success()
     return response
+
+
+_DONE = object()
+
+
+def calls_per_minute() -> float:
+    """Current (adapted) CoinGecko call rate."""
+    return _bucket.calls_per_minute
+
+
+def fetch_concurrent(items, fetch, *, concurrency: int = CONCURRENCY, stop=None):
+    """Run `fetch(item)` for every item with up to `concurrency` calls in flight.
+
+    Yields `(item, result, error)` tuples in completion order, on the
+    caller's thread — so checkpointing and raw writes stay single-threaded.
+    `error` is the exception raised by `fetch` (result is None), or None.
+    Only `concurrency` items are submitted ahead of the consumer; closing
+    the generator early cancels everything not yet started.
+
+    `stop`, if given, is called before each submission; once it returns True
+    nothing more is submitted, in-flight items are still yielded, and the
+    generator ends.
+    """
+    items = iter(items)
+    in_flight = {}
+    stopped = False
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        def submit_next() -> bool:
+            nonlocal stopped
+            if stopped:
+                return False
+            item = next(items, _DONE)
+            if item is _DONE:
+                return False
+            if stop is not None and stop():
+                stopped = True
+                return False
+            # Copy the context so tracking in worker threads sees the node's task ID
+            ctx = contextvars.copy_context()
+            in_flight[pool.submit(ctx.run, fetch, item)] = item
+            return True
+
+        try:
+            while len(in_flight) < concurrency and submit_next():
+                pass
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = in_flight.pop(future)
+                    error = future.exception()
+                    yield item, (None if error else future.result()), error
+                    submit_next()
+        finally:
+            for future in in_flight:
+                future.cancel()
+
@@ -1,11 +1,13 @@
 """Ingest CoinGecko coin list.
 
-This node fetches the top 1000 coins by market cap from CoinGecko API.
+This node fetches the top 1000 coins by market cap from CoinGecko API and
+stores each day's list as a columnar snapshot (see coin_universe).
 """
 
 from datetime import datetime, timezone
-from subsets_utils import save_raw_json, load_state, save_state
+from subsets_utils import load_state, save_state
 from connector_utils import rate_limited_get
+import coin_universe
 
 # Top 1000 coins by market cap - covers 99%+ of total market cap.
 # CoinGecko lists 10,000+ coins but most are illiquid/defunct.
@@ -13,14 +15,21 @@ TARGET_COUNT = 1000
 
 
 def run():
-    """Fetch top coins by market cap and append to historical list."""
+    """Fetch top coins by market cap and append today's snapshot to the universe history."""
     print("Fetching coins...")
     run_date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
     run_timestamp = datetime.now(timezone.utc).isoformat()
 
-    # Check if we already have data for today
     state = load_state("coins")
     last_date = state.get("last_date")
+
+    # JSON snapshots + ID lists in state predate the columnar history
+    if not coin_universe.has_index() and (state.get("all_coin_ids") or last_date):
+        n = coin_universe.migrate_legacy(state)
+        save_state("coins", {k: v for k, v in state.items() if k not in ("all_coin_ids", "last_seen")})
+        print(f"  Migrated {n} coin IDs to the columnar universe history")
+
+    # Check if we already have data for today
     if last_date == run_date:
         print(f"  Already fetched coins today ({run_date})")
         return
@@ -53,29 +62,15 @@ def run():
 
     print(f"  Total: {len(all_coins)} coins")
 
-    # Save today's snapshot with date
-    save_raw_json({
-        "coins": all_coins,
-        "timestamp": run_timestamp,
-        "date": run_date
-    }, f"coins/{run_date}")
-
-    # Also save as "coins" for backward compat with prices ingest
-    save_raw_json({"coins": all_coins, "timestamp": run_timestamp}, "coins")
-
-    # Track all unique coin IDs we've ever seen
-    all_coin_ids = set(state.get("all_coin_ids", []))
-    new_ids = set(c["id"] for c in all_coins)
-    all_coin_ids.update(new_ids)
+    total = coin_universe.save_snapshot(run_date, all_coins)
 
     save_state("coins", {
         "last_date": run_date,
         "last_updated": run_timestamp,
-        "all_coin_ids": list(all_coin_ids),
-        "total_unique_coins": len(all_coin_ids)
+        "total_unique_coins": total,
     })
 
-    print(f"  Unique coins tracked: {len(all_coin_ids)}")
+    print(f"  Unique coins tracked: {total}")
 
 
 NODES = {
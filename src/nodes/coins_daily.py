@@ -0,0 +1,208 @@
+"""Transform daily coin-universe snapshots into a coin rank/market dataset.
+
+Each coins_universe/{date} snapshot (see coin_universe) becomes that day's
+rows: rank, supply, ATH/ATL and 24h change fields per coin. Only snapshot
+dates newer than the last merged one are read, one date per record batch.
+"""
+
+import itertools
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from subsets_utils import merge, load_state, save_state, validate, publish, by_month
+import coin_universe
+
+DATASET_ID = "coingecko_coins_daily"
+
+# Month partitions: each day's merge scans and rewrites only its own month
+PARTITION_BY = [by_month("date")]
+
+# Output column → snapshot column
+COLUMNS = {
+    "date": "date",
+    "coin_id": "coin_id",
+    "rank": "rank",
+    "market_cap_rank": "market_cap_rank",
+    "symbol": "symbol",
+    "name": "name",
+    "price_usd": "current_price",
+    "market_cap_usd": "market_cap",
+    "fully_diluted_valuation_usd": "fully_diluted_valuation",
+    "volume_usd": "total_volume",
+    "high_24h_usd": "high_24h",
+    "low_24h_usd": "low_24h",
+    "price_change_24h_usd": "price_change_24h",
+    "price_change_pct_24h": "price_change_percentage_24h",
+    "market_cap_change_24h_usd": "market_cap_change_24h",
+    "market_cap_change_pct_24h": "market_cap_change_percentage_24h",
+    "circulating_supply": "circulating_supply",
+    "total_supply": "total_supply",
+    "max_supply": "max_supply",
+    "ath_usd": "ath",
+    "ath_change_pct": "ath_change_percentage",
+    "ath_date": "ath_date",
+    "atl_usd": "atl",
+    "atl_change_pct": "atl_change_percentage",
+    "atl_date": "atl_date",
+    "last_updated": "last_updated",
+}
+
+SCHEMA = pa.schema([
+    ("date", pa.string()),
+    ("coin_id", pa.string()),
+    ("rank", pa.int32()),
+    ("market_cap_rank", pa.int32()),
+    ("symbol", pa.string()),
+    ("name", pa.string()),
+    ("price_usd", pa.float64()),
+    ("market_cap_usd", pa.float64()),
+    ("fully_diluted_valuation_usd", pa.float64()),
+    ("volume_usd", pa.float64()),
+    ("high_24h_usd", pa.float64()),
+    ("low_24h_usd", pa.float64()),
+    ("price_change_24h_usd", pa.float64()),
+    ("price_change_pct_24h", pa.float64()),
+    ("market_cap_change_24h_usd", pa.float64()),
+    ("market_cap_change_pct_24h", pa.float64()),
+    ("circulating_supply", pa.float64()),
+    ("total_supply", pa.float64()),
+    ("max_supply", pa.float64()),
+    ("ath_usd", pa.float64()),
+    ("ath_change_pct", pa.float64()),
+    ("ath_date", pa.string()),
+    ("atl_usd", pa.float64()),
+    ("atl_change_pct", pa.float64()),
+    ("atl_date", pa.string()),
+    ("last_updated", pa.string()),
+])
+
+METADATA = {
+    "id": DATASET_ID,
+    "title": "CoinGecko Cryptocurrency Rankings (Daily)",
+    "description": "Daily snapshot of the top 1000 cryptocurrencies by market cap from CoinGecko: rank, price, supply, all-time high/low and 24-hour changes, one row per coin per day.",
+    "license": "CoinGecko Free API Terms of Service",
+    "column_descriptions": {
+        "date": "Snapshot date (YYYY-MM-DD)",
+        "coin_id": "CoinGecko coin identifier (e.g., 'bitcoin', 'ethereum')",
+        "rank": "Position in that day's market-cap ordering (1 = largest)",
+        "market_cap_rank": "CoinGecko's reported market cap rank",
+        "symbol": "Ticker symbol",
+        "name": "Coin name",
+        "price_usd": "Price in USD at snapshot time",
+        "market_cap_usd": "Market capitalization in USD",
+        "fully_diluted_valuation_usd": "Fully diluted valuation in USD",
+        "volume_usd": "24-hour trading volume in USD",
+        "high_24h_usd": "24-hour high price in USD",
+        "low_24h_usd": "24-hour low price in USD",
+        "price_change_24h_usd": "24-hour price change in USD",
+        "price_change_pct_24h": "24-hour price change in percent",
+        "market_cap_change_24h_usd": "24-hour market cap change in USD",
+        "market_cap_change_pct_24h": "24-hour market cap change in percent",
+        "circulating_supply": "Coins in circulation",
+        "total_supply": "Total coins issued",
+        "max_supply": "Maximum coins that will ever exist (null if uncapped)",
+        "ath_usd": "All-time high price in USD",
+        "ath_change_pct": "Percent from all-time high",
+        "ath_date": "Timestamp of the all-time high (ISO 8601)",
+        "atl_usd": "All-time low price in USD",
+        "atl_change_pct": "Percent from all-time low",
+        "atl_date": "Timestamp of the all-time low (ISO 8601)",
+        "last_updated": "When CoinGecko last updated the coin's market data (ISO 8601)",
+        "date_month": "Month of the snapshot (YYYY-MM); the table's partition column",
+    }
+}
+
+
+def test(table: pa.Table) -> None:
+    """Validate one or more snapshot days. Raises AssertionError on failure."""
+    # Schema validation - all columns must be listed
+    validate(table, {
+        "columns": {
+            "date": "string",
+            "coin_id": "string",
+            "rank": "int32",
+            "market_cap_rank": "int32",
+            "symbol": "string",
+            "name": "string",
+            "price_usd": "double",
+            "market_cap_usd": "double",
+            "fully_diluted_valuation_usd": "double",
+            "volume_usd": "double",
+            "high_24h_usd": "double",
+            "low_24h_usd": "double",
+            "price_change_24h_usd": "double",
+            "price_change_pct_24h": "double",
+            "market_cap_change_24h_usd": "double",
+            "market_cap_change_pct_24h": "double",
+            "circulating_supply": "double",
+            "total_supply": "double",
+            "max_supply": "double",
+            "ath_usd": "double",
+            "ath_change_pct": "double",
+            "ath_date": "string",
+            "atl_usd": "double",
+            "atl_change_pct": "double",
+            "atl_date": "string",
+            "last_updated": "string",
+        },
+        "not_null": ["date", "coin_id", "rank"],
+        "unique": ["date", "coin_id"],
+        "min_rows": 100,
+        # Date format validation
+        "formats": {"date": "date"},
+        # Ranks start at 1; prices and volumes can't be negative
+        "positive": ["rank"],
+        "non_negative": ["price_usd", "volume_usd"],
+        # A full day's universe always has the majors
+        "contains": {"coin_id": {"bitcoin", "ethereum"}},
+    })
+
+
+def _day_batch(date: str) -> pa.RecordBatch:
+    """One snapshot date as a batch in SCHEMA (renamed columns, plain string coin_id)."""
+    snap = coin_universe.load_snapshot(date, list(set(COLUMNS.values())))
+    table = pa.table(
+        [pc.cast(snap.column(src), SCHEMA.field(name).type) for name, src in COLUMNS.items()],
+        schema=SCHEMA,
+    )
+    # Built column-wise: to_batches() yields no batch at all for an empty table
+    return pa.RecordBatch.from_arrays([c.combine_chunks() for c in table.columns], schema=SCHEMA)
+
+
+def _stream(dates: list[str]):
+    """One tested batch per snapshot date (dates are key-disjoint)."""
+    for date in dates:
+        batch = _day_batch(date)
+        test(batch)
+        yield batch
+
+
+def run():
+    """Merge snapshot days newer than the last merged one."""
+    print("Transforming coin snapshots to daily dataset...")
+
+    through = load_state(DATASET_ID).get("through", "")
+    dates = [d for d in coin_universe.snapshot_dates() if d > through]
+    if not dates:
+        print(f"  Skipping {DATASET_ID} - no snapshots after {through or 'start'}")
+        return
+
+    print(f"  Processing {len(dates)} snapshot days ({dates[0]} to {dates[-1]})...")
+    batches = _stream(dates)
+    reader = pa.RecordBatchReader.from_batches(SCHEMA, itertools.chain([next(batches)], batches))
+    # test() already ran the key check (not_null + unique) on every batch
+    merge(reader, DATASET_ID, key=["coin_id", "date"], partition_by=PARTITION_BY, validate=False)
+    publish(DATASET_ID, METADATA)
+    save_state(DATASET_ID, {"through": dates[-1]})
+    print("  Done!")
+
+
+from nodes.coins import run as coins_run
+
+NODES = {
+    run: [coins_run],
+}
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,55 @@
+"""Periodic Delta table maintenance: compaction, Z-ordering and vacuum.
+
+Every daily merge adds a few small files and leaves the ones it replaced
+behind. Once a week (MAINTENANCE_EVERY_DAYS) this node compacts each
+published table, Z-ordered by coin_id so per-coin reads skip most files, and
+vacuums files unreferenced for longer than the retention window.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+
+from subsets_utils import load_state, save_state, optimize, vacuum
+from nodes.prices_daily import DATASET_ID as PRICES_DAILY
+from nodes.coins_daily import DATASET_ID as COINS_DAILY
+
+EVERY_DAYS = float(os.environ.get("MAINTENANCE_EVERY_DAYS", "7"))
+# None → the table's own retention (delta.deletedFileRetentionDuration, 7 days)
+RETENTION_HOURS = int(os.environ["MAINTENANCE_RETENTION_HOURS"]) if os.environ.get("MAINTENANCE_RETENTION_HOURS") else None
+
+# Dataset → Z-order columns
+TABLES = {
+    PRICES_DAILY: ["coin_id"],
+    COINS_DAILY: ["coin_id"],
+}
+
+
+def run():
+    """Optimize and vacuum every table, at most once per EVERY_DAYS."""
+    print("Maintaining Delta tables...")
+
+    state = load_state("maintenance")
+    last_run = state.get("last_run")
+    now = datetime.now(timezone.utc)
+    if last_run and now - datetime.fromisoformat(last_run) < timedelta(days=EVERY_DAYS):
+        print(f"  Skipping - last run {last_run}, due every {EVERY_DAYS:g} days")
+        return
+
+    for dataset_id, z_order in TABLES.items():
+        optimize(dataset_id, z_order=z_order)
+        vacuum(dataset_id, retention_hours=RETENTION_HOURS)
+
+    save_state("maintenance", {"last_run": now.isoformat()})
+    print("  Done!")
+
+
+from nodes.prices_daily import run as prices_daily_run
+from nodes.coins_daily import run as coins_daily_run
+
+NODES = {
+    run: [prices_daily_run, coins_daily_run],
+}
+
+
+if __name__ == "__main__":
+    run()
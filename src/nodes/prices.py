@@ -1,69 +1,364 @@
 """Ingest CoinGecko price history.
 
-This node fetches price history for all tracked coins, saving each coin separately.
+This node fetches price history for all tracked coins into the price_store.
+Requests run concurrently (COINGECKO_CONCURRENCY in flight) but share one token
+bucket, so the call rate stays at COINGECKO_CALLS_PER_MINUTE. Results are
+handled on the main thread in completion order and checkpointed per coin into
+an append-only Checkpoint log (batched segment writes, periodic compaction).
+
+State keeps a high-water mark per coin (timestamp of the last point fetched).
+New coins get the full 365-day backfill; coins whose last fetch is older than
+PRICES_REFRESH_AFTER_HOURS are refreshed with only the days since their mark,
+and the new points are spliced onto the stored chart. Charts go to the
+consolidated price_store, one segment per FLUSH_EVERY fetched coins.
+Coins in the current markets snapshot skip that daily refresh: prices_daily
+builds their latest rows from the snapshots coins.py already downloads, and
+market_chart is kept for backfills and gaps (PRICES_GAP_REFRESH_DAYS).
+Each rewrite is logged on the coin's mark (when, and from which point), which
+lets prices_daily re-merge only the coins and days that changed.
+
+Coins that 404 or come back empty are tombstoned on their mark and re-probed
+with exponential backoff (PRICES_TOMBSTONE_BASE_DAYS doubling up to
+PRICES_TOMBSTONE_MAX_DAYS); IDs missing from coins snapshots for
+PRICES_PRUNE_AFTER_DAYS are no longer fetched at all.
+
+Jobs run in priority order (see _priority): current top coins and the most
+out-of-date histories first. Each invocation runs within a time/request
+budget (PRICES_TIME_BUDGET_S, PRICES_MAX_REQUESTS). When it runs out,
+in-flight requests finish, progress is checkpointed and run() returns True
+so the runner retriggers (exit 2).
 """
 
-from datetime import datetime, timezone
-from subsets_utils import save_raw_json, load_raw_json, load_state, save_state
-from connector_utils import rate_limited_get, CoinNotFoundError
+import math
+import os
+from datetime import datetime, timezone, timedelta
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from subsets_utils import load_state, save_state, Checkpoint, Budget
+from connector_utils import (
+    rate_limited_get, fetch_concurrent, calls_per_minute, CoinNotFoundError, CONCURRENCY,
+)
+import coin_universe
+import price_store
+
+# Free tier limit: 365 days of history per coin.
+# Full historical data (days=max) requires a paid CoinGecko API plan.
+FULL_HISTORY_DAYS = 365
+
+# Default wall-clock budget per invocation (PRICES_TIME_BUDGET_S overrides;
+# PRICES_MAX_REQUESTS adds a request cap). Leaves headroom under the 6h
+# GitHub Actions job limit for the transform and upload.
+DEFAULT_TIME_BUDGET_S = 5 * 3600
+
+# Coins in the latest /coins/markets snapshot get their daily rows from the
+# snapshots (see prices_daily), so their market_chart is only refetched to
+# fill days no snapshot covers, or after this many days to reconcile
+# snapshot values with CoinGecko's daily series.
+GAP_REFRESH_DAYS = float(os.environ.get("PRICES_GAP_REFRESH_DAYS", "30"))
+
+# Coins that 404 or return no prices are tombstoned: re-probed after
+# BASE days, doubling per failed probe up to MAX, instead of every cycle.
+TOMBSTONE_BASE_DAYS = float(os.environ.get("PRICES_TOMBSTONE_BASE_DAYS", "1"))
+TOMBSTONE_MAX_DAYS = float(os.environ.get("PRICES_TOMBSTONE_MAX_DAYS", "90"))
+
+# IDs absent from every coins snapshot for this long are no longer fetched.
+PRUNE_AFTER_DAYS = float(os.environ.get("PRICES_PRUNE_AFTER_DAYS", "90"))
+
+# Coins in the top N of the latest coins snapshot are scheduled first.
+PRIORITY_TOP_N = int(os.environ.get("PRICES_PRIORITY_TOP_N", "1000"))
+
+# A coin is refreshed once its last fetch is older than this.
+REFRESH_AFTER_HOURS = float(os.environ.get("PRICES_REFRESH_AFTER_HOURS", "24"))
+
+DAY_MS = 86_400_000
+
+# Fetched charts are appended to price_store this many coins at a time (one
+# segment each); their marks are checkpointed only once the segment is stored.
+FLUSH_EVERY = int(os.environ.get("PRICES_FLUSH_EVERY", "50"))
+
+# Raw rewrites remembered per coin as [changed_at, since_ts] pairs (since_ts is
+# the first rewritten point, None for a full backfill). prices_daily consumes
+# the entries newer than its watermark; if all of them are, it may have missed
+# older ones and re-merges the whole coin.
+CHANGE_HISTORY = 8
+
+
+def _fetch_market_chart(job: tuple[str, int]) -> dict:
+    """Fetch `days` of one coin's daily market chart. Runs on a fetch_concurrent worker."""
+    coin_id, days = job
+    url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart"
+    params = {
+        "vs_currency": "usd",
+        "days": days,
+        "interval": "daily"
+    }
+    return rate_limited_get(url, params=params).json()
+
+
+def _last_ts(chart: pa.Table) -> int | None:
+    """Timestamp (ms) of the newest price point in a chart table."""
+    ts = price_store.chart_series(chart, "prices").column("ts")
+    return ts[-1].as_py() if len(ts) else None
+
+
+def _refresh_days(last_ts: int | None, now_ms: int) -> int:
+    """Days to request so the response overlaps the high-water mark."""
+    if last_ts is None:
+        return FULL_HISTORY_DAYS
+    return min(FULL_HISTORY_DAYS, max(1, math.ceil((now_ms - last_ts) / DAY_MS) + 1))
+
+
+def _is_stale(mark: dict, now: datetime) -> bool:
+    fetched_at = mark.get("fetched_at")
+    if not fetched_at:
+        return True
+    age_h = (now - datetime.fromisoformat(fetched_at)).total_seconds() / 3600
+    return age_h >= REFRESH_AFTER_HOURS
+
+
+def _snapshot_ranks() -> dict[str, int]:
+    """coin_id → position in the latest coins snapshot (1 = largest market cap)."""
+    latest = coin_universe.latest_snapshot(["coin_id", "rank"])
+    if latest is None:
+        return {}
+    return dict(zip(
+        pc.cast(latest.column("coin_id"), pa.string()).to_pylist(),
+        latest.column("rank").to_pylist(),
+    ))
+
+
+def _tombstone(mark: dict, reason: str, now: datetime) -> dict:
+    """Dead-coin record for a failed probe: next probe after an exponentially growing wait."""
+    dead = mark.get("dead") or {}
+    probes = dead.get("probes", 0) + 1
+    wait_days = min(TOMBSTONE_MAX_DAYS, TOMBSTONE_BASE_DAYS * 2 ** (probes - 1))
+    return {
+        "reason": reason,
+        "since": dead.get("since", now.isoformat()),
+        "probes": probes,
+        "next_probe": (now + timedelta(days=wait_days)).isoformat(),
+    }
+
+
+def _pruned(seen: tuple[str, str] | None, now: datetime) -> bool:
+    """Whether an ID (first, last seen) has been missing from coins snapshots for PRUNE_AFTER_DAYS."""
+    if seen is None:
+        return False
+    return (now.date() - datetime.fromisoformat(seen[1]).date()).days > PRUNE_AFTER_DAYS
+
+
+def _snapshot_covered(mark: dict, snapshot_days: set[str], now: datetime) -> bool:
+    """Whether markets snapshots cover every day since the coin's last chart point.
+
+    Presence in each day's snapshot is approximated by presence in the
+    latest one (the caller checks that); a missing snapshot day is a gap.
+    """
+    last_ts = mark.get("last_ts")
+    if last_ts is None:
+        return False
+    day = datetime.fromtimestamp(last_ts / 1000, timezone.utc).date()
+    today = now.date()
+    if (today - day).days > GAP_REFRESH_DAYS:
+        return False
+    while day < today:
+        day += timedelta(days=1)
+        if day.isoformat() not in snapshot_days:
+            return False
+    return True
+
+
+def _priority(coin_id: str, mark: dict | None, ranks: dict[str, int], now: datetime) -> tuple:
+    """Sort key for a job: most valuable first, so a budget cut drops the least.
+
+    Tombstone re-probes come last, and coins in the current top PRIORITY_TOP_N
+    come before the rest. Within each group, days of missing data weighted by
+    market-cap rank decide — a coin never fetched counts as a full year stale,
+    so a missing history outranks a day-old refresh further down the list.
+    """
+    rank = ranks.get(coin_id)
+    in_top = rank is not None and rank <= PRIORITY_TOP_N
+    mark = mark or {}
+    # Re-probes of tombstoned coins go last
+    dead = bool(mark.get("dead"))
+    if mark.get("fetched_at"):
+        stale_days = (now - datetime.fromisoformat(mark["fetched_at"])).total_seconds() / 86400
+    elif mark.get("last_ts"):
+        stale_days = (now.timestamp() * 1000 - mark["last_ts"]) / DAY_MS
+    else:
+        stale_days = FULL_HISTORY_DAYS
+    value = stale_days / math.log2((rank or PRIORITY_TOP_N) + 1)
+    return (dead, not in_top, -value, rank or math.inf, coin_id)
+
+
+def _legacy_marks(state: dict) -> dict[str, dict]:
+    """Per-coin marks from pre-Checkpoint state (`coins` dict or write-once `completed` list).
+
+    Legacy coins have no recorded fetch time, so they are treated as stale and
+    their high-water mark is read back from the stored chart once.
+    """
+    marks = dict(state.get("coins", {}))
+    missing = [coin_id for coin_id in state.get("completed", []) if coin_id not in marks]
+    last = {coin_id: _last_ts(chart) for coin_id, chart in price_store.read_charts(missing)}
+    for coin_id in missing:
+        marks[coin_id] = {"last_ts": last.get(coin_id), "fetched_at": None}
+    return marks
+
+
+def _fetch_all(jobs: list[tuple[str, int]], marks: dict, checkpoint: Checkpoint, budget: Budget) -> None:
+    """Fetch jobs until done or out of budget, store charts and checkpoint each coin's new mark."""
+    prior = calls_per_minute() / 60
+    stored = price_store.stored_coins()
+    charts, replace, pending = {}, set(), {}
+
+    def flush():
+        # Charts first: a checkpointed mark always has its points stored
+        price_store.append(charts, replace=replace)
+        checkpoint.update(pending)
+        charts.clear()
+        replace.clear()
+        pending.clear()
+
+    def out_of_budget() -> bool:
+        # Keep back enough time for the requests still in flight to land
+        return not budget.take(reserve_s=CONCURRENCY / budget.rate(prior))
+
+    results = fetch_concurrent(jobs, _fetch_market_chart, stop=out_of_budget)
+    try:
+        for i, ((coin_id, days), data, error) in enumerate(results, 1):
+            budget.done()
+            prefix = f"  [{i}/{len(jobs)}] {coin_id}..."
+            mark = marks.get(coin_id, {})
+            now = datetime.now(timezone.utc)
+            changed, since, dead, chart = False, None, None, None
+            if isinstance(error, CoinNotFoundError):
+                dead = _tombstone(mark, "not_found", now)
+                print(f"{prefix} (not found - next probe {dead['next_probe'][:10]})")
+            elif error is not None:
+                raise error
+            elif not data.get("prices"):
+                dead = _tombstone(mark, "empty", now)
+                print(f"{prefix} (no data - next probe {dead['next_probe'][:10]})")
+            elif mark.get("last_ts") is None or coin_id not in stored:
+                chart = price_store.chart_table(data)
+                replace.add(coin_id)
+                changed = True
+                print(f"{prefix} ({len(data['prices'])} days)")
+            else:
+                changed, since = True, int(data["prices"][0][0])
+                chart = price_store.chart_table(data)
+                print(f"{prefix} (refreshed {days}d)")
+
+            fetched_at = now.isoformat()
+            marks[coin_id] = {
+                "last_ts": (_last_ts(chart) if chart is not None else None) or mark.get("last_ts"),
+                "fetched_at": fetched_at,
+            }
+            changes = mark.get("changes", [])
+            if changed:
+                changes = (changes + [[fetched_at, since]])[-CHANGE_HISTORY:]
+            if changes:
+                marks[coin_id]["changes"] = changes
+            if dead:
+                marks[coin_id]["dead"] = dead
+            if chart is not None:
+                charts[coin_id] = chart
+            pending[coin_id] = marks[coin_id]
+            if len(charts) >= FLUSH_EVERY:
+                flush()
+    finally:
+        # On error too: everything fetched so far is real progress
+        flush()
 
 
 def run():
-    """Fetch price history for all tracked coins, saving each coin separately."""
+    """Backfill new coins and refresh stale ones into the price_store.
+
+    Returns True (continuation) when the invocation's budget ran out first.
+    """
     print("Fetching prices...")
+    budget = Budget.from_env("PRICES", time_s=DEFAULT_TIME_BUDGET_S)
 
-    # Get all unique coins we've ever tracked (from coins state)
-    coins_state = load_state("coins")
-    all_coin_ids = coins_state.get("all_coin_ids", [])
+    # Every coin that has ever been in a coins snapshot, with first/last seen
+    seen = coin_universe.first_last_seen()
+    all_coin_ids = sorted(seen)
 
-    # If no state yet, fall back to current coins.json
     if not all_coin_ids:
-        coins_data = load_raw_json("coins")
-        all_coin_ids = [c["id"] for c in coins_data["coins"]]
+        print("  No coins snapshot yet")
+        return
 
-    state = load_state("prices")
-    completed = set(state.get("completed", []))
+    # Per-coin raw files predate the consolidated store
+    if not price_store.has_index():
+        n = price_store.migrate_legacy()
+        if n:
+            print(f"  Migrated {n} per-coin raw charts to the price store")
 
-    pending = [c for c in all_coin_ids if c not in completed]
+    checkpoint = Checkpoint("prices")
+    marks = checkpoint.load()
+    if not marks:
+        marks = _legacy_marks(load_state("prices"))
+        if marks:
+            checkpoint.update(marks)
+            checkpoint.compact()
+            print(f"  Migrated {len(marks)} coins from legacy prices state")
 
-    if not pending:
+    now = datetime.now(timezone.utc)
+    now_ms = int(now.timestamp() * 1000)
+    ranks = _snapshot_ranks()
+    snapshot_days = set(coin_universe.snapshot_dates())
+    jobs = []
+    n_snapshot = n_dead = n_pruned = 0
+    for coin_id in all_coin_ids:
+        mark = marks.get(coin_id)
+        if _pruned(seen.get(coin_id), now):
+            n_pruned += 1
+        elif mark is None:
+            jobs.append((coin_id, FULL_HISTORY_DAYS))
+        elif mark.get("dead"):
+            if now < datetime.fromisoformat(mark["dead"]["next_probe"]):
+                n_dead += 1
+            else:
+                jobs.append((coin_id, _refresh_days(mark.get("last_ts"), now_ms)))
+        elif not _is_stale(mark, now):
+            continue
+        elif coin_id in ranks and _snapshot_covered(mark, snapshot_days, now):
+            n_snapshot += 1
+        else:
+            jobs.append((coin_id, _refresh_days(mark.get("last_ts"), now_ms)))
+
+    if n_snapshot:
+        print(f"  {n_snapshot} coins refreshed from markets snapshots (no market_chart call)")
+    if n_dead or n_pruned:
+        print(f"  Skipping {n_dead} tombstoned coins until their next probe, "
+              f"{n_pruned} absent from snapshots for {PRUNE_AFTER_DAYS:.0f}+ days")
+
+    if not jobs:
+        save_state("prices_backlog", {"remaining": 0})
         print("  All coins up to date")
         return
 
-    print(f"  Fetching prices for {len(pending)} coins ({len(completed)} already done)...")
+    jobs.sort(key=lambda job: _priority(job[0], marks.get(job[0]), ranks, now))
 
-    for i, coin_id in enumerate(pending, 1):
-        print(f"  [{i}/{len(pending)}] {coin_id}...", end=" ")
+    n_new = sum(1 for coin_id, _ in jobs if coin_id not in marks)
+    print(f"  Fetching prices for {len(jobs)} coins ({n_new} new, {len(jobs) - n_new} refresh, "
+          f"{len(marks)} tracked)...")
 
-        url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart"
-        # Free tier limit: 365 days of history per coin.
-        # Full historical data (days=max) requires a paid CoinGecko API plan.
-        params = {
-            "vs_currency": "usd",
-            "days": 365,
-            "interval": "daily"
-        }
+    prior = calls_per_minute() / 60
+    print(f"  Plan: {budget.plan(len(jobs), prior)}; first up: {', '.join(c for c, _ in jobs[:5])}")
 
-        try:
-            response = rate_limited_get(url, params=params)
-            data = response.json()
+    with checkpoint:
+        _fetch_all(jobs, marks, checkpoint, budget)
 
-            if data.get("prices"):
-                save_raw_json(data, f"prices/{coin_id}")
-                print(f"({len(data['prices'])} days)")
-            else:
-                save_raw_json({"prices": [], "market_caps": [], "total_volumes": []}, f"prices/{coin_id}")
-                print("(no data)")
-        except CoinNotFoundError:
-            print("(not found - skipping)")
-
-        completed.add(coin_id)
-        save_state("prices", {
-            "completed": list(completed),
-            "last_updated": datetime.now(timezone.utc).isoformat()
-        })
-
-    print(f"  Total: {len(completed)} coins fetched")
+    print(f"  Total: {len(marks)} coins tracked")
+
+    # Lets prices_daily hold its first full pass until a cold backfill is done
+    remaining = len(jobs) - budget.completed
+    save_state("prices_backlog", {"remaining": remaining})
+
+    if budget.stopped:
+        print(f"  Budget reached after {budget.requests} requests ({budget.elapsed / 60:.0f} min); "
+              f"{budget.plan(remaining, prior)}")
+        return True
 
 
 from nodes.coins import run as coins_run
@@ -1,36 +1,91 @@
 """Transform CoinGecko price data into clean daily prices dataset.
 
-This node transforms per-coin raw price files into a single unified dataset.
+This node transforms the raw charts in price_store into a single unified
+dataset. The store is read in groups of price_store.SEGMENT_COINS coins and
+coins are streamed into the merge as one record batch each, so memory is
+bounded by one group's charts rather than the whole universe. State keeps
+a content digest per coin, so only coins whose rows actually changed are
+merged. After the first run only coins the prices node
+rewrote since the last run are read, and only from the first rewritten day.
+Coins the prices node didn't refetch get their latest days from the daily
+/coins/markets snapshots instead.
 """
 
-import pyarrow as pa
+import itertools
+import os
 from datetime import datetime, timezone
-from subsets_utils import load_raw_json, merge, load_state, save_state, data_hash, validate, publish
-from subsets_utils.testing import assert_valid_date, assert_positive
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from subsets_utils import (
+    merge, overwrite, load_state, save_state, publish, Checkpoint,
+    content_hash, by_month,
+)
+from subsets_utils.testing import ValidationPlan
+from nodes.prices import CHANGE_HISTORY
+import coin_universe
+import price_store
 
 DATASET_ID = "coingecko_prices_daily"
 
+# Month partitions: merges scan and rewrite only the months their rows fall in
+PARTITION_BY = [by_month("date")]
+
+# Stored type of `date`: "string" (YYYY-MM-DD, what consumers have always
+# read) or "date32" (4 bytes, integer comparisons in joins and pruning).
+# Rows are built as date32 from the chart timestamps either way; the string
+# form is a single cast per batch on the way out. Changing it rewrites the
+# table on the next run. date32 is a breaking change for consumers that
+# compare `date` to strings: Delta tables have no views, so the published
+# column description says how to get the string form back instead.
+DATE_TYPE = os.environ.get("PRICES_DAILY_DATE_TYPE", "string")
+_DATE = pa.date32() if DATE_TYPE == "date32" else pa.string()
+
+SCHEMA = pa.schema([
+    ("date", _DATE),
+    ("coin_id", pa.string()),
+    ("price_usd", pa.float64()),
+    ("volume_usd", pa.float64()),
+    ("market_cap_usd", pa.float64()),
+])
+
 METADATA = {
     "id": DATASET_ID,
     "title": "CoinGecko Cryptocurrency Prices (Daily)",
     "description": "Daily cryptocurrency prices, trading volumes, and market capitalizations from CoinGecko. Covers top 1000+ coins by market cap with 365 days of history.",
     "license": "CoinGecko Free API Terms of Service",
     "column_descriptions": {
-        "date": "Date of observation (YYYY-MM-DD)",
+        "date": (
+            "Date of observation (DATE). Before PRICES_DAILY_DATE_TYPE=date32 this was a "
+            "YYYY-MM-DD string; CAST(date AS VARCHAR) gives that form"
+            if DATE_TYPE == "date32" else "Date of observation (YYYY-MM-DD)"
+        ),
         "coin_id": "CoinGecko coin identifier (e.g., 'bitcoin', 'ethereum')",
-        "price_usd": "Closing price in USD",
-        "volume_usd": "24-hour trading volume in USD",
-        "market_cap_usd": "Market capitalization in USD",
+        "price_usd": (
+            "Price in USD: the last price-history point of the day, or for days past a "
+            "coin's history, the /coins/markets price at snapshot time (not a daily close)"
+        ),
+        "volume_usd": "24-hour trading volume in USD, taken at the same point as price_usd",
+        "market_cap_usd": "Market capitalization in USD, taken at the same point as price_usd",
+        "date_month": "Month of the observation (YYYY-MM); the table's partition column",
     }
 }
 
 
-def test(table: pa.Table) -> None:
-    """Validate transform output. Raises AssertionError on failure."""
-    # Schema validation - all columns must be listed
-    validate(table, {
+def _date(iso: str):
+    """YYYY-MM-DD as a value of the stored date type (for comparisons)."""
+    return pa.scalar(iso).cast(_DATE).as_py()
+
+
+def _checks(*, full: bool = True) -> ValidationPlan:
+    """Checks for streamed batches, all evaluated in one pass per batch.
+
+    Dataset-wide totals only apply when every coin streams (`full`).
+    """
+    plan = {
+        # Schema validation - all columns must be listed
         "columns": {
-            "date": "string",
+            "date": str(_DATE),
             "coin_id": "string",
             "price_usd": "double",
             "volume_usd": "double",
@@ -38,109 +93,257 @@ def test(table: pa.Table) -> None:
         },
         "not_null": ["date", "coin_id"],
         "unique": ["date", "coin_id"],
-        "min_rows": 1000,
-    })
-
-    # Date format validation
-    assert_valid_date(table, "date")
-
-    # Price should be positive where not null
-    assert_positive(table, "price_usd")
-
-    # Volume should be positive or zero where not null
-    assert_positive(table, "volume_usd", allow_zero=True)
-
-    # Market cap should be positive where not null
-    assert_positive(table, "market_cap_usd")
-
-    # Check reasonable date range (365 days of history per API limit)
-    dates = table.column("date").to_pylist()
-    min_date = min(dates)
-    max_date = max(dates)
-    assert min_date >= "2023-01-01", f"Data too old: {min_date}"
-    assert max_date <= "2030-01-01", f"Future dates found: {max_date}"
-
-    # Verify we have multiple coins
-    coin_ids = set(table.column("coin_id").to_pylist())
-    assert len(coin_ids) >= 100, f"Expected 100+ coins, got {len(coin_ids)}"
+        # Prices, volumes and market caps can't be negative where not null
+        "non_negative": ["price_usd", "volume_usd", "market_cap_usd"],
+        # Check reasonable date range (365 days of history per API limit)
+        "ranges": {"date": (_date("2023-01-01"), _date("2030-01-01"))},
+    }
+    if DATE_TYPE == "string":
+        # Date format validation (date32 values are valid by type)
+        plan["formats"] = {"date": "date"}
+    if full:
+        plan["min_rows"] = 1000
+        # Verify we have multiple coins
+        plan["min_distinct"] = {"coin_id": 100}
+        # Check for expected major coins
+        plan["contains"] = {"coin_id": {"bitcoin", "ethereum"}}
+    # Coins seen are tracked for the summary either way
+    return ValidationPlan(plan, track_distinct=["coin_id"])
+
+
+def _summary(checks: ValidationPlan) -> None:
+    lo, hi = checks.bounds.get("date", (None, None))
+    print(f"  Validated: {checks.rows:,} rows, {len(checks.distinct['coin_id'])} coins, "
+          f"dates {lo} to {hi}")
+
+
+def _aligned(values: pa.Array, n: int) -> pa.Array:
+    """`values` cut or null-padded to n, for position alignment with the prices series."""
+    if len(values) >= n:
+        return values.slice(0, n)
+    return pa.concat_arrays([values, pa.nulls(n - len(values), pa.float64())])
+
+
+def _coin_batch(coin_id: str, chart: pa.Table) -> pa.RecordBatch | None:
+    """Columnar transform of one coin's stored market_chart into daily rows.
+
+    CoinGecko returns multiple points per day (near midnight and end of day);
+    the last point of each UTC day wins. Volumes and market caps are aligned
+    to prices by position. Returns None when the coin has no price points.
+    """
+    prices = price_store.chart_series(chart, "prices")
+    n = len(prices)
+    if not n:
+        return None
+
+    dates = pc.cast(pc.cast(prices.column("ts").combine_chunks(), pa.timestamp("ms")), pa.date32())
+
+    # Last point per date, dates ordered by first appearance
+    positions = pa.table({"date": dates, "i": pa.array(range(n), pa.int64())})
+    last = (
+        positions.group_by("date", use_threads=False)
+        .aggregate([("i", "min"), ("i", "max")])
+        .sort_by("i_min")
+        .column("i_max")
+        .combine_chunks()
+    )
+
+    def values(key):
+        return pc.take(_aligned(price_store.chart_series(chart, key).column("value").combine_chunks(), n), last)
+
+    return pa.RecordBatch.from_arrays([
+        pc.cast(pc.take(dates, last), _DATE),
+        pa.array([coin_id] * len(last), pa.string()),
+        values("prices"),
+        values("total_volumes"),
+        values("market_caps"),
+    ], schema=SCHEMA)
+
+
+def _chart_end(mark: dict | None) -> str:
+    """Last date covered by a coin's raw market_chart ("" if none)."""
+    last_ts = (mark or {}).get("last_ts")
+    if last_ts is None:
+        return ""
+    return datetime.fromtimestamp(last_ts / 1000, timezone.utc).date().isoformat()
+
+
+def _snapshot_batch(date: str, marks: dict) -> pa.RecordBatch | None:
+    """Rows for `date` from that day's /coins/markets snapshot.
+
+    Only coins whose chart data stops before `date` get a row; once a chart
+    refresh covers the day, its row replaces this one on merge. CoinGecko
+    reports 0 for unknown prices/market caps, which become nulls.
+    """
+    try:
+        snap = coin_universe.load_snapshot(date, ["coin_id", "current_price", "total_volume", "market_cap"])
+    except FileNotFoundError:
+        return None
+    coin_ids = pc.cast(snap.column("coin_id"), pa.string())
+    chart_end = pa.array([_chart_end(marks.get(c)) for c in coin_ids.to_pylist()], pa.string())
+    snap = snap.filter(pc.less(chart_end, date))
+    if not len(snap):
+        return None
+
+    def positive(column: str, allow_zero: bool = False) -> pa.ChunkedArray:
+        values = snap.column(column)
+        keep = pc.greater_equal(values, 0) if allow_zero else pc.greater(values, 0)
+        return pc.if_else(keep, values, pa.scalar(None, pa.float64()))
+
+    table = pa.table([
+        pc.cast(pa.array([date] * len(snap), pa.string()), _DATE),
+        pc.cast(snap.column("coin_id"), pa.string()),
+        positive("current_price"),
+        positive("total_volume", allow_zero=True),
+        positive("market_cap"),
+    ], schema=SCHEMA)
+    # Built column-wise: to_batches() yields no batch at all for an empty table
+    return pa.RecordBatch.from_arrays([c.combine_chunks() for c in table.columns], schema=SCHEMA)
+
+
+def _dirty_since(mark: dict, watermark: str) -> tuple[bool, str | None]:
+    """Whether a coin's raw file changed after `watermark`, and the first date affected.
+
+    Returns (dirty, since_date); since_date None means the whole coin. Change
+    entries come from the prices node's mark (see prices.CHANGE_HISTORY).
+    """
+    changes = mark.get("changes", [])
+    fresh = [since for changed_at, since in changes if changed_at > watermark]
+    if not fresh:
+        return False, None
+    if None in fresh or len(fresh) == len(changes) == CHANGE_HISTORY:
+        # Full rewrite, or the log may have dropped entries we never saw
+        return True, None
+    since_ms = min(fresh)
+    return True, datetime.fromtimestamp(since_ms / 1000, timezone.utc).date().isoformat()
+
+
+def _stream(
+    jobs: list[tuple[str, str | None]],
+    snapshots: list[str],
+    marks: dict,
+    checks: ValidationPlan,
+    digests: dict[str, str],
+):
+    """Read, transform and check one coin at a time; yield only coins whose content changed.
+
+    `jobs` are (coin_id, since_date) pairs: rows before since_date are left
+    out of the merge (None keeps them all). A coin is passed on only when the
+    content_hash of its full history differs from the digest stored by the
+    last run; `digests` is updated in place. Then one batch per new markets
+    snapshot date follows (see _snapshot_batch) — disjoint from the chart
+    rows, since it only covers days past each coin's chart.
+
+    Each batch holds a single coin, so batches are key-disjoint and per-batch
+    uniqueness checks cover the whole dataset. The summary checks run after
+    the last batch, while the merge is still consuming the stream — a
+    failure there aborts it before anything is committed.
+    """
+    since_dates = dict(jobs)
+    for coin_id, chart in price_store.read_charts(since_dates):
+        since = since_dates[coin_id]
+        batch = _coin_batch(coin_id, chart)
+        if batch is None:
+            continue
+        digest = content_hash(batch)
+        if since is not None:
+            batch = batch.filter(pc.greater_equal(batch.column("date"), _date(since)))
+        checks.update(batch)
+        if digests.get(coin_id) != digest:
+            digests[coin_id] = digest
+            if len(batch):
+                yield batch
 
-    # Check for expected major coins
-    expected_coins = {"bitcoin", "ethereum"}
-    missing = expected_coins - coin_ids
-    assert not missing, f"Missing expected coins: {missing}"
+    for date in snapshots:
+        batch = _snapshot_batch(date, marks)
+        if batch is not None:
+            checks.update(batch)
+            yield batch
 
-    print(f"  Validated: {len(table):,} rows, {len(coin_ids)} coins, dates {min_date} to {max_date}")
+    checks.finish()
+    _summary(checks)
 
 
 def run():
-    """Transform per-coin price files into a single unified dataset."""
+    """Merge coins whose raw files changed since the last run, one coin in memory at a time.
+
+    The first run (or PRICES_DAILY_FULL=1) streams every coin and runs the
+    dataset-wide checks; later runs only consume coins the prices node
+    rewrote after the stored watermark, from the first day it rewrote.
+    Markets snapshots newer than the last one ingested add each day's rows
+    for coins whose charts weren't refetched. When DATE_TYPE differs from
+    the stored one, everything is rebuilt and the table overwritten.
+    """
     print("Transforming prices to daily dataset...")
 
-    # Get list of coins from state (instead of list_raw_files)
-    prices_state = load_state("prices")
-    coin_ids = prices_state.get("completed", [])
+    # Get list of coins from the prices checkpoint (instead of list_raw_files)
+    marks = Checkpoint("prices").load()
 
-    if not coin_ids:
+    if not marks:
         print("  No price data found")
         return
 
-    print(f"  Processing {len(coin_ids)} coins...")
-
-    records = []
-
-    for coin_id in coin_ids:
-        try:
-            data = load_raw_json(f"prices/{coin_id}")
-        except FileNotFoundError:
-            continue
-
-        prices = data.get("prices", [])
-        volumes = data.get("total_volumes", [])
-        market_caps = data.get("market_caps", [])
-
-        # CoinGecko returns multiple points per day (near midnight and end of day)
-        # Deduplicate by keeping the last (most recent) price per day
-        daily_records = {}
-        for i, price_point in enumerate(prices):
-            timestamp_ms = price_point[0]
-            date = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d")
-
-            # Keep last entry per date (overwrites earlier ones)
-            daily_records[date] = {
-                "date": date,
-                "coin_id": coin_id,
-                "price_usd": price_point[1] if len(price_point) > 1 else None,
-                "volume_usd": volumes[i][1] if i < len(volumes) and len(volumes[i]) > 1 else None,
-                "market_cap_usd": market_caps[i][1] if i < len(market_caps) and len(market_caps[i]) > 1 else None,
-            }
-
-        records.extend(daily_records.values())
-
-    if not records:
-        print("  No records to transform")
-        return
-
-    schema = pa.schema([
-        ("date", pa.string()),
-        ("coin_id", pa.string()),
-        ("price_usd", pa.float64()),
-        ("volume_usd", pa.float64()),
-        ("market_cap_usd", pa.float64()),
-    ])
-
-    table = pa.Table.from_pylist(records, schema=schema)
-    print(f"  Transformed {len(table):,} records from {len(coin_ids)} coins")
-
-    h = data_hash(table)
-    if load_state(DATASET_ID).get("hash") == h:
-        print(f"  Skipping {DATASET_ID} - unchanged")
-        return
-
-    test(table)
-
-    merge(table, DATASET_ID, key=["coin_id", "date"])
-    publish(DATASET_ID, METADATA)
-    save_state(DATASET_ID, {"hash": h})
+    state = load_state(DATASET_ID)
+    watermark = state.get("fetched_through")
+    stored_type = state.get("date_type", "string")
+    retype = watermark is not None and stored_type != DATE_TYPE
+    full = watermark is None or retype or os.environ.get("PRICES_DAILY_FULL") == "1"
+    latest = max(
+        (changed_at for mark in marks.values() for changed_at, _ in mark.get("changes", [])),
+        default=watermark or "",
+    )
+    # A type change rewrites the table from scratch: every coin, every snapshot
+    snapshot_through = "" if retype else state.get("snapshot_through", "")
+    snapshots = [d for d in coin_universe.snapshot_dates() if d > snapshot_through]
+    if retype:
+        print(f"  Rewriting {DATASET_ID} with date as {DATE_TYPE} (was {stored_type})")
+
+    if full:
+        backlog = load_state("prices_backlog").get("remaining", 0)
+        if watermark is None and backlog:
+            # Dataset-wide checks would fail on a partial universe
+            print(f"  Deferring first full pass - prices backfill has {backlog} coins left")
+            return
+        # Coins without a single chart point (tombstoned) have no raw file
+        jobs = [(coin_id, None) for coin_id, mark in marks.items() if mark.get("last_ts") is not None]
+        print(f"  Processing {len(jobs)} coins (full)...")
+    else:
+        jobs = []
+        for coin_id, mark in marks.items():
+            dirty, since = _dirty_since(mark, watermark)
+            if dirty:
+                jobs.append((coin_id, since))
+        if not jobs and not snapshots:
+            print(f"  Skipping {DATASET_ID} - no coins changed since {watermark}")
+            return
+        print(f"  Processing {len(jobs)} changed of {len(marks)} coins, "
+              f"{len(snapshots)} new markets snapshots...")
+
+    checks = _checks(full=full)
+    old_digests = {} if retype else state.get("coins", {})
+    digests = dict(old_digests)
+    batches = _stream(jobs, snapshots, marks, checks, digests)
+    first = next(batches, None)
+    if first is None:
+        print(f"  Skipping {DATASET_ID} - content unchanged ({checks.rows:,} rows)")
+    else:
+        reader = pa.RecordBatchReader.from_batches(SCHEMA, itertools.chain([first], batches))
+        if retype:
+            overwrite(reader, DATASET_ID, partition_by=PARTITION_BY)
+        else:
+            # _checks() already ran the key check (not_null + unique) on every batch
+            merge(reader, DATASET_ID, key=["coin_id", "date"], partition_by=PARTITION_BY, validate=False)
+        changed = sum(1 for c, d in digests.items() if old_digests.get(c) != d)
+        print(f"  Merged {changed} changed coins and {len(snapshots)} markets snapshots "
+              f"({checks.rows:,} rows checked)")
+        publish(DATASET_ID, METADATA)
+
+    save_state(DATASET_ID, {
+        "fetched_through": latest,
+        "snapshot_through": max(snapshots, default=snapshot_through),
+        "coins": digests,
+        "date_type": DATE_TYPE,
+    })
     print("  Done!")
 
 
@@ -0,0 +1,285 @@
+"""Consolidated store of raw CoinGecko market_chart histories.
+
+Charts used to be one raw object per coin, so rebuilding prices_daily took a
+read per coin. They now go to a log of segments (zstd Arrow IPC, coin_id
+dictionary-encoded) at raw/prices_store/{seq}.arrow. Each append writes one
+segment holding a batch of coins' charts. A small index at
+raw/prices_store_index.parquet maps every coin to its entries: the segment,
+row offset and length, and whether the entry replaces the coin's chart or is
+spliced onto it (new points replace the overlapping tail).
+
+Reads go by segment: read_charts() takes coins SEGMENT_COINS at a time and
+reads each segment a group touches once, in order, so at most one group's
+charts are held while they are assembled from their entries. load_chart()
+still addresses a single coin for debugging. Once COMPACT_AFTER segments
+have piled up, the live charts are rewritten into segments of SEGMENT_COINS
+coins and the superseded segments are deleted.
+"""
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from subsets_utils import (
+    save_raw_arrow, load_raw_arrow, load_raw_json, save_raw_parquet, load_raw_parquet,
+    list_raw_files, raw_asset_exists, delete_raw_file,
+)
+
+INDEX_ASSET = "prices_store_index"
+SEGMENT_COINS = 250
+COMPACT_AFTER = 32
+
+CHART_KEYS = ("prices", "market_caps", "total_volumes")
+
+# A coin's chart: one row per [ts, value] point, `series` naming its
+# CHART_KEYS array, rows in payload order.
+CHART_SCHEMA = pa.schema([
+    ("series", pa.dictionary(pa.int8(), pa.string())),
+    ("ts", pa.int64()),
+    ("value", pa.float64()),
+])
+_SERIES = pa.array(CHART_KEYS, pa.string())
+
+SEGMENT_SCHEMA = pa.schema([("coin_id", pa.dictionary(pa.int32(), pa.string()))] + list(CHART_SCHEMA))
+
+INDEX_SCHEMA = pa.schema([
+    ("coin_id", pa.string()),
+    ("segment", pa.int64()),
+    ("offset", pa.int64()),
+    ("length", pa.int64()),
+    ("replace", pa.bool_()),
+])
+
+
+# =============================================================================
+# Charts
+# =============================================================================
+
+def chart_table(data: dict) -> pa.Table:
+    """market_chart payload → chart table (CHART_SCHEMA). Points without a value get a null."""
+    parts = []
+    for code, key in enumerate(CHART_KEYS):
+        points = pa.array(data.get(key) or [], type=pa.list_(pa.float64()))
+        has_value = pc.greater(pc.list_value_length(points), 1)
+        values = pc.if_else(has_value, points, pa.scalar([None, None], points.type))
+        series = pa.DictionaryArray.from_arrays(pa.array([code] * len(points), pa.int8()), _SERIES)
+        parts.append(pa.table([
+            series,
+            pc.cast(pc.list_element(points, 0), pa.int64(), safe=False),
+            pc.list_element(values, 1),
+        ], schema=CHART_SCHEMA))
+    return pa.concat_tables(parts)
+
+
+def chart_series(chart: pa.Table, key: str) -> pa.Table:
+    """One CHART_KEYS series of a chart table as (ts, value) rows, in payload order."""
+    return chart.filter(pc.equal(chart.column("series"), key)).select(["ts", "value"])
+
+
+def splice(old: pa.Table, new: pa.Table) -> pa.Table:
+    """Splice a refresh into a chart: new points replace the overlapping tail.
+
+    The newest stored point is usually an intraday snapshot, so anything at or
+    after the first refreshed timestamp is dropped rather than deduplicated.
+    """
+    parts = []
+    for key in CHART_KEYS:
+        is_key = pc.equal(old.column("series"), key)
+        fresh = new.filter(pc.equal(new.column("series"), key))
+        if len(fresh):
+            is_key = pc.and_(is_key, pc.less(old.column("ts"), fresh.column("ts")[0]))
+        parts += [old.filter(is_key), fresh]
+    return pa.concat_tables(parts)
+
+
+# =============================================================================
+# Index
+# =============================================================================
+
+def _asset(seq: int) -> str:
+    return f"prices_store/{seq:010d}"
+
+
+def _load_index() -> dict[str, list[list]]:
+    """coin_id → [segment, offset, length, replace] entries, oldest first."""
+    if not raw_asset_exists(INDEX_ASSET):
+        return {}
+    index = {}
+    table = load_raw_parquet(INDEX_ASSET)
+    for coin_id, *entry in zip(*(table.column(c).to_pylist() for c in INDEX_SCHEMA.names)):
+        index.setdefault(coin_id, []).append(entry)
+    return index
+
+
+def _save_index(index: dict[str, list[list]]) -> None:
+    rows = [(coin_id, *entry) for coin_id, entries in index.items() for entry in entries]
+    rows.sort(key=lambda r: (r[1], r[2]))
+    save_raw_parquet(pa.table(
+        [pa.array([r[i] for r in rows], f.type) for i, f in enumerate(INDEX_SCHEMA)],
+        schema=INDEX_SCHEMA,
+    ), INDEX_ASSET)
+
+
+def _live(index: dict[str, list[list]]) -> dict[str, list[list]]:
+    """Each coin's entries from its last replacement on; older ones are superseded."""
+    live = {}
+    for coin_id, entries in index.items():
+        start = max((i for i, e in enumerate(entries) if e[3]), default=0)
+        live[coin_id] = entries[start:]
+    return live
+
+
+def _segments(index: dict[str, list[list]]) -> set[int]:
+    return {entry[0] for entries in index.values() for entry in entries}
+
+
+def has_index() -> bool:
+    return raw_asset_exists(INDEX_ASSET)
+
+
+def stored_coins() -> set[str]:
+    """Coins with a stored chart."""
+    return set(_load_index())
+
+
+# =============================================================================
+# Writes
+# =============================================================================
+
+def _write_segment(index: dict[str, list[list]], seq: int, charts: dict[str, pa.Table], replace) -> None:
+    """Store `charts` as segment `seq` and add their entries to `index`."""
+    offset = 0
+    for coin_id, chart in charts.items():
+        index.setdefault(coin_id, []).append([seq, offset, len(chart), coin_id in replace])
+        offset += len(chart)
+    coins = pa.array(
+        [coin_id for coin_id, chart in charts.items() for _ in range(len(chart))], pa.string()
+    ).dictionary_encode()
+    table = pa.concat_tables(list(charts.values())).combine_chunks()
+    save_raw_arrow(pa.table([coins, *table.columns], schema=SEGMENT_SCHEMA), _asset(seq))
+
+
+def append(charts: dict[str, pa.Table], *, replace=frozenset()) -> None:
+    """Store one batch of charts as a new segment; compact if due.
+
+    Charts of coins in `replace` supersede the stored chart; the rest are
+    spliced onto it (see splice).
+    """
+    if not charts:
+        return
+    index = _load_index()
+    _write_segment(index, max(_segments(index), default=0) + 1, charts, replace)
+    _save_index(index)
+    if len(_segments(index)) >= COMPACT_AFTER:
+        compact()
+
+
+def compact() -> None:
+    """Rewrite the live charts into segments of SEGMENT_COINS coins; delete the rest."""
+    index = _load_index()
+    # New segments are numbered past every live one, so none is overwritten mid-read
+    seq = max(_segments(index), default=0)
+    compacted, batch = {}, {}
+    for coin_id, chart in _read(_live(index)):
+        batch[coin_id] = chart
+        if len(batch) >= SEGMENT_COINS:
+            seq += 1
+            _write_segment(compacted, seq, batch, batch)
+            batch = {}
+    if batch:
+        _write_segment(compacted, seq + 1, batch, batch)
+    _save_index(compacted)
+
+    keep = _segments(compacted)
+    for path in list_raw_files("prices_store/*.arrow"):
+        seq = int(path.rsplit("/", 1)[-1].split(".", 1)[0])
+        if seq not in keep:
+            delete_raw_file(_asset(seq), "arrow")
+    print(f"  Compacted raw price store: {len(compacted)} coins in {len(keep)} segment(s)")
+
+
+def migrate_legacy() -> int:
+    """One-off import of the per-coin raw/prices/{coin_id} files (.arrow, or
+    .json from before that). The files are left in place. Returns coins imported.
+    """
+    files = {}
+    for path in list_raw_files("prices/*"):
+        name = path.rsplit("/", 1)[-1]
+        for ext in (".arrow", ".json.gz", ".json"):
+            if name.endswith(ext):
+                files.setdefault(name[:-len(ext)], set()).add(ext)
+    batch = {}
+    for coin_id, exts in sorted(files.items()):
+        if ".arrow" in exts:
+            batch[coin_id] = load_raw_arrow(f"prices/{coin_id}")
+        else:
+            batch[coin_id] = chart_table(load_raw_json(f"prices/{coin_id}"))
+        if len(batch) >= SEGMENT_COINS:
+            append(batch, replace=batch)
+            batch = {}
+    append(batch, replace=batch)
+    return len(files)
+
+
+# =============================================================================
+# Reads
+# =============================================================================
+
+def _read(wanted: dict[str, list[list]]):
+    """Assemble each wanted coin's chart from its entries, SEGMENT_COINS coins at a time.
+
+    Coins are grouped in the order of their first live entry, so a group
+    mostly shares its segments. Each group reads the segments it touches once,
+    in order, and holds only its own coins' partial charts.
+    """
+    order = sorted(wanted, key=lambda coin_id: wanted[coin_id][0][:2])
+    for start in range(0, len(order), SEGMENT_COINS):
+        yield from _read_group({coin_id: wanted[coin_id] for coin_id in order[start:start + SEGMENT_COINS]})
+
+
+def _read_group(wanted: dict[str, list[list]]):
+    """Assemble the wanted coins' charts, reading each segment they touch once, in order."""
+    by_segment = {}
+    for coin_id, entries in wanted.items():
+        for entry in entries:
+            by_segment.setdefault(entry[0], []).append(coin_id)
+    remaining = {coin_id: len(entries) for coin_id, entries in wanted.items()}
+    partial = {}
+    for seq in sorted(by_segment):
+        entries = sorted(
+            ((coin_id, e) for coin_id in by_segment[seq] for e in wanted[coin_id] if e[0] == seq),
+            key=lambda item: item[1][1],
+        )
+        # Copy out just this group's rows (in segment order), so held charts
+        # don't pin the whole segment
+        segment = load_raw_arrow(_asset(seq))
+        rows = segment.filter(
+            pc.is_in(segment.column("coin_id"), pa.array(by_segment[seq], pa.string()))
+        ).drop_columns(["coin_id"])
+        del segment
+        start = 0
+        for coin_id, (_, _, length, replace) in entries:
+            chart = rows.slice(start, length)
+            start += length
+            partial[coin_id] = chart if replace or coin_id not in partial else splice(partial[coin_id], chart)
+            remaining[coin_id] -= 1
+            if not remaining[coin_id]:
+                yield coin_id, partial.pop(coin_id)
+
+
+def read_charts(coin_ids):
+    """(coin_id, chart) for each of `coin_ids` with a stored chart, in storage order.
+
+    Segments are read once per group of SEGMENT_COINS coins that touches
+    them, however many of those coins they hold.
+    """
+    live = _live(_load_index())
+    return _read({c: live[c] for c in coin_ids if c in live})
+
+
+def load_chart(coin_id: str) -> pa.Table:
+    """One coin's stored chart. Raises FileNotFoundError.
+
+    Meant for debugging; bulk reads use read_charts.
+    """
+    for _, chart in read_charts([coin_id]):
+        return chart
+    raise FileNotFoundError(f"No stored chart for '{coin_id}'")
@@ -4,10 +4,14 @@ from .io import (
     save_raw_json, load_raw_json,
     save_raw_file, load_raw_file,
     save_raw_parquet, load_raw_parquet, raw_parquet_localpath,
+    save_raw_arrow, load_raw_arrow,
     list_raw_files, delete_raw_file, data_hash, raw_parquet_hash, raw_asset_exists,
+    content_hash, ContentHasher,
     raw_writer, raw_reader, raw_parquet_writer,
 )
-from .delta import merge, overwrite, append, validate_asset, WriteResult
+from .checkpoint import Checkpoint
+from .budget import Budget
+from .delta import merge, overwrite, append, validate_asset, WriteResult, by_month, optimize, vacuum
 from .orchestrator import DAG, load_nodes
 from . import duckdb
 from .config import validate_environment, get_data_dir, is_cloud, get_fs
@@ -20,15 +24,19 @@ __all__ = [
     # HTTP
     'get', 'post', 'put', 'delete', 'get_client', 'configure_http',
     # Delta writes
-    'merge', 'overwrite', 'append', 'validate_asset', 'WriteResult',
+    'merge', 'overwrite', 'append', 'validate_asset', 'WriteResult', 'by_month',
+    # Delta maintenance
+    'optimize', 'vacuum',
     # Publishing
     'publish',
     # State & raw I/O
     'load_state', 'save_state', 'load_asset', 'data_hash', 'raw_parquet_hash',
+    'content_hash', 'ContentHasher',
     'save_raw_json', 'load_raw_json', 'save_raw_file', 'load_raw_file',
     'save_raw_parquet', 'load_raw_parquet', 'raw_parquet_localpath',
+    'save_raw_arrow', 'load_raw_arrow',
     'list_raw_files', 'delete_raw_file',
-    'raw_asset_exists',
+    'raw_asset_exists', 'Checkpoint', 'Budget',
     # Streaming I/O
     'raw_writer', 'raw_reader', 'raw_parquet_writer',
     # Config
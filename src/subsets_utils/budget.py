@@ -0,0 +1,92 @@
+"""Per-invocation work budget for long-running fetch nodes.
+
+GitHub Actions kills a job at its timeout, losing whatever the node was in
+the middle of. A node that knows its budget can instead stop taking new work
+shortly before the limit, finish what is in flight, and return True — the
+orchestrator marks the run for continuation (runner exit 2) and the next
+invocation picks up from the node's checkpoint.
+
+Usage:
+    budget = Budget.from_env("PRICES")    # PRICES_TIME_BUDGET_S, PRICES_MAX_REQUESTS
+    for item, result, error in fetch_concurrent(jobs, fetch, stop=lambda: not budget.take()):
+        budget.done()
+        ...
+    return budget.stopped                  # True → continuation
+"""
+
+import math
+import os
+import time
+
+
+class Budget:
+    """Wall-clock and request budget for one invocation.
+
+    Args:
+        time_s: Seconds the invocation may spend, counted from construction.
+            None means unlimited.
+        max_requests: Requests the invocation may start. None means unlimited.
+    """
+
+    def __init__(self, time_s: float | None = None, max_requests: int | None = None):
+        self.time_s = time_s
+        self.max_requests = max_requests
+        self.requests = 0
+        self.completed = 0
+        self.stopped = False
+        self._start = time.monotonic()
+
+    @classmethod
+    def from_env(cls, prefix: str, *, time_s: float | None = None) -> "Budget":
+        """Budget from `<prefix>_TIME_BUDGET_S` / `<prefix>_MAX_REQUESTS`, `time_s` as the default."""
+        t = os.environ.get(f"{prefix}_TIME_BUDGET_S")
+        n = os.environ.get(f"{prefix}_MAX_REQUESTS")
+        return cls(
+            time_s=float(t) if t else time_s,
+            max_requests=int(n) if n else None,
+        )
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self._start
+
+    def take(self, reserve_s: float = 0.0) -> bool:
+        """Claim one request if the budget allows it.
+
+        `reserve_s` is time kept back for work already in flight to finish;
+        once it no longer fits, nothing new is claimed and `stopped` is set.
+        """
+        if self.max_requests is not None and self.requests >= self.max_requests:
+            self.stopped = True
+        elif self.time_s is not None and self.elapsed + reserve_s >= self.time_s:
+            self.stopped = True
+        if self.stopped:
+            return False
+        self.requests += 1
+        return True
+
+    def done(self) -> None:
+        """Record one finished request (feeds the observed rate)."""
+        self.completed += 1
+
+    def rate(self, prior: float | None = None) -> float | None:
+        """Observed requests per second, or `prior` until something has finished."""
+        if self.completed and self.elapsed > 0:
+            return self.completed / self.elapsed
+        return prior
+
+    def plan(self, remaining: int, prior: float | None = None) -> str:
+        """Human-readable estimate of how long `remaining` requests take, in invocations."""
+        rate = self.rate(prior)
+        if not remaining:
+            return "nothing left"
+        if not rate:
+            return f"{remaining} left"
+        seconds = remaining / rate
+        per_run = []
+        if self.time_s is not None:
+            per_run.append(self.time_s * rate)
+        if self.max_requests is not None:
+            per_run.append(self.max_requests)
+        runs = f", ~{math.ceil(remaining / min(per_run))} invocation(s)" if per_run else ""
+        return f"{remaining} left at {rate * 60:.1f}/min ≈ {seconds / 3600:.1f}h{runs}"
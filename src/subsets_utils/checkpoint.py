@@ -0,0 +1,155 @@
+"""Append-only checkpoint log for high-frequency per-item progress.
+
+`save_state()` rewrites the whole state document (and re-reads it first for
+debug logging), so checkpointing after every item costs two round-trips and
+O(items) bytes each time — quadratic over a run. A Checkpoint instead buffers
+`record()` calls and flushes them as small immutable JSONL segments:
+
+    state/<asset>.log/0000000001.jsonl
+    state/<asset>.log/0000000002.jsonl
+    ...
+
+Every `compact_after` segments the log is folded into the regular state file
+(`{"entries": {...}, "through": <last folded seq>}` via `save_state`) and the
+folded segments are deleted. `load()` replays base + remaining segments, so a
+crash between writing the base and deleting segments is harmless: segments at
+or below `through` are ignored.
+
+Usage:
+    with Checkpoint("prices") as cp:
+        done = cp.load()                  # {key: value}
+        for item in work:
+            ...
+            cp.record(item.id, {"fetched_at": ...})
+    # exiting the block flushes whatever is still buffered
+"""
+
+import json
+import time
+
+from .config import state_uri, get_fs
+from .io import load_state, save_state, _read_bytes, _write_bytes, _delete
+
+
+class Checkpoint:
+    """Buffered, append-only key → value progress log backed by state storage.
+
+    Args:
+        asset: State asset name. The compacted base lives in the asset's
+            regular state file; segments live next to it under `<asset>.log/`.
+        flush_every: Flush after this many buffered records.
+        flush_interval_s: Flush when the oldest buffered record is this old.
+        compact_after: Fold segments into the base once this many exist.
+    """
+
+    def __init__(
+        self,
+        asset: str,
+        *,
+        flush_every: int = 50,
+        flush_interval_s: float = 60.0,
+        compact_after: int = 20,
+    ):
+        self.asset = asset
+        self.flush_every = flush_every
+        self.flush_interval_s = flush_interval_s
+        self.compact_after = compact_after
+        self._entries: dict | None = None
+        self._pending: dict = {}
+        self._pending_since: float | None = None
+        self._segments: list[int] = []
+        self._through = 0
+
+    # -------------------------------------------------------------------------
+    # Storage layout
+    # -------------------------------------------------------------------------
+
+    def _segment_uri(self, seq: int) -> str:
+        return state_uri(f"{self.asset}.log/{seq:010d}", "jsonl")
+
+    def _list_segments(self) -> list[int]:
+        """Sequence numbers of segments currently in storage, ascending."""
+        pattern = state_uri(f"{self.asset}.log/*", "jsonl")
+        fs = get_fs(pattern)
+        try:
+            paths = fs.glob(pattern)
+        except FileNotFoundError:
+            return []
+        seqs = []
+        for p in paths:
+            name = p.rsplit("/", 1)[-1].split(".", 1)[0]
+            if name.isdigit():
+                seqs.append(int(name))
+        return sorted(seqs)
+
+    # -------------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------------
+
+    def load(self) -> dict:
+        """Return all entries: compacted base, then segments replayed in order."""
+        base = load_state(self.asset)
+        self._through = base.get("through", 0)
+        entries = dict(base.get("entries", {}))
+        self._segments = [s for s in self._list_segments() if s > self._through]
+        for seq in self._segments:
+            data = _read_bytes(self._segment_uri(seq))
+            if not data:
+                continue
+            for line in data.decode("utf-8").splitlines():
+                if line:
+                    rec = json.loads(line)
+                    entries[rec["k"]] = rec["v"]
+        self._entries = entries
+        return dict(entries)
+
+    def record(self, key: str, value) -> None:
+        """Buffer one entry; flushes once the batch is big or old enough."""
+        self.update({key: value})
+
+    def update(self, entries: dict) -> None:
+        """Buffer many entries at once; at most one segment is written."""
+        if self._entries is None:
+            self.load()
+        self._entries.update(entries)
+        self._pending.update(entries)
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+        if (
+            len(self._pending) >= self.flush_every
+            or time.monotonic() - self._pending_since >= self.flush_interval_s
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered entries as one new segment; compact if due."""
+        if not self._pending:
+            return
+        seq = max([self._through, *self._segments]) + 1
+        body = "".join(json.dumps({"k": k, "v": v}) + "\n" for k, v in self._pending.items())
+        _write_bytes(self._segment_uri(seq), body.encode("utf-8"))
+        self._segments.append(seq)
+        self._pending = {}
+        self._pending_since = None
+        if len(self._segments) >= self.compact_after:
+            self.compact()
+
+    def compact(self) -> None:
+        """Fold all segments (and anything still buffered) into the base state file."""
+        if self._entries is None:
+            self.load()
+        through = max([self._through, *self._segments])
+        save_state(self.asset, {"entries": self._entries, "through": through})
+        for seq in self._segments:
+            _delete(self._segment_uri(seq))
+        self._segments = []
+        self._through = through
+        self._pending = {}
+        self._pending_since = None
+
+    def __enter__(self) -> "Checkpoint":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # Flush on error too: everything recorded so far is real progress.
+        self.flush()
@@ -84,12 +84,12 @@ def mirror_raw_path(asset_id: str, ext: str = "parquet") -> Path | None:
     return root / get_connector_name() / "data" / "raw" / f"{asset_id}.{ext}"
 
 
-def mirror_state_path(asset: str) -> Path | None:
+def mirror_state_path(asset: str, ext: str = "json") -> Path | None:
     """Path to a state file in the SSD mirror. Returns None if mirror unavailable."""
     root = get_mirror_root()
     if root is None:
         return None
-    return root / get_connector_name() / "data" / "state" / f"{asset}.json"
+    return root / get_connector_name() / "data" / "state" / f"{asset}.{ext}"
 
 
 # =============================================================================
@@ -213,7 +213,7 @@ def state_key(asset: str) -> str:
     return f"{get_r2_base()}/state/{asset}.json"
 
 
-def state_uri(asset: str) -> str:
+def state_uri(asset: str, ext: str = "json") -> str:
     """URI for a state file. s3:// in cloud, local path in dev.
 
     State writes are direct PUTs in cloud — each `save_state()` call
@@ -222,8 +222,8 @@ def state_uri(asset: str) -> str:
     across the whole fleet — see cost analysis).
     """
     if is_cloud():
-        return f"s3://{get_bucket_name()}/{get_r2_base()}/state/{asset}.json"
-    return state_path(asset)
+        return f"s3://{get_bucket_name()}/{get_r2_base()}/state/{asset}.{ext}"
+    return state_path(asset, ext)
 
 
 def subsets_uri(dataset_name: str) -> str:
@@ -245,8 +245,8 @@ def raw_path(asset_id: str, ext: str = "parquet") -> str:
     return str(path)
 
 
-def state_path(asset: str) -> str:
+def state_path(asset: str, ext: str = "json") -> str:
     """Local path for a state file. Creates parent dirs."""
-    path = Path(get_data_dir()) / "state" / f"{asset}.json"
+    path = Path(get_data_dir()) / "state" / f"{asset}.{ext}"
     path.parent.mkdir(parents=True, exist_ok=True)
     return str(path)
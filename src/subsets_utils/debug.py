@@ -64,6 +64,17 @@ def log_http_request(method, url, status_code, duration_ms=None, error=None, **k
     }, ["timestamp", "run_id", "method", "url", "status", "duration_ms", "error"])
 
 
+def log_metric(name, value, **labels):
+    """Log a point-in-time metric (e.g. a limiter's current rate)."""
+    _append_csv("metrics.csv", {
+        "timestamp": datetime.now().isoformat(),
+        "run_id": os.environ.get('RUN_ID', 'unknown'),
+        "name": name,
+        "value": value,
+        "labels": ";".join(f"{k}={v}" for k, v in sorted(labels.items())),
+    }, ["timestamp", "run_id", "name", "value", "labels"])
+
+
 def log_data_output(dataset_name, row_count, size_bytes, columns=None, null_counts=None, **kwargs):
     """Log dataset output metadata.
 
@@ -1,14 +1,22 @@
-"""Delta table operations: merge, overwrite, append.
+"""Delta table operations: merge, overwrite, append, and maintenance.
 
 Simple, explicit API for writing to Delta tables.
 No hidden defaults. No escape hatches.
+
+Tables can be partitioned by plain columns or by a column derived from one
+(see by_month). Merges into a partitioned table only scan the partitions the
+source touches. optimize() and vacuum() keep a table that is merged into
+every day from degrading into thousands of small files.
 """
 
 import os
+import tempfile
 from dataclasses import dataclass
+from datetime import date, datetime
 from pathlib import Path
-from typing import Union
+from typing import Callable, Union
 import pyarrow as pa
+import pyarrow.compute as pc
 from deltalake import write_deltalake, DeltaTable, CommitProperties
 try:
     from deltalake.exceptions import TableNotFoundError
@@ -18,9 +26,10 @@ except ImportError:
     except ImportError:
         TableNotFoundError = None  # fallback: we'll handle by exception type name
 
-from .config import get_data_dir, is_cloud, get_storage_options, subsets_uri
+from .config import get_data_dir, is_cloud, get_storage_options, subsets_uri, get_fs
 from . import debug
-from .io import data_hash
+from .io import ContentHasher
+from .testing import check_keys
 from .tracking import record_write
 
 
@@ -72,6 +81,268 @@ class WriteResult:
     rows: int
 
 
+# =============================================================================
+# Partitioning
+# =============================================================================
+
+@dataclass(frozen=True)
+class Partition:
+    """A partition column derived from a source column.
+
+    Writes add `name` to every row as `derive(source column)` (a string
+    array), so callers keep producing rows without it. Create via by_month().
+    """
+    name: str
+    source: str
+    derive: Callable[[pa.Array], pa.Array]
+
+
+def _month(values: pa.Array) -> pa.Array:
+    if pa.types.is_string(values.type) or pa.types.is_large_string(values.type):
+        return pc.utf8_slice_codeunits(values, 0, 7)  # "YYYY-MM-DD" → "YYYY-MM"
+    return pc.strftime(pc.cast(values, pa.timestamp("s")), format="%Y-%m")
+
+
+def by_month(column: str) -> Partition:
+    """Partition by calendar month (YYYY-MM) of a date column, as `<column>_month`.
+
+    Month partitions keep partition counts low (12 a year) while a daily
+    merge of recent dates touches only one or two of them.
+    """
+    return Partition(f"{column}_month", column, _month)
+
+
+def _partition_names(partition_by: list) -> list[str] | None:
+    if not partition_by:
+        return None
+    return [p.name if isinstance(p, Partition) else p for p in partition_by]
+
+
+def _with_partitions(source, partition_by: list):
+    """Add derived partition columns to a Table or stream (no-op without any)."""
+    derived = [p for p in partition_by or [] if isinstance(p, Partition)]
+    derived = [p for p in derived if p.name not in source.schema.names]
+    if not derived:
+        return source
+
+    def add(batch):
+        for p in derived:
+            batch = batch.append_column(p.name, pc.cast(p.derive(batch.column(p.source)), pa.string()))
+        return batch
+
+    if isinstance(source, pa.RecordBatchReader):
+        schema = source.schema
+        for p in derived:
+            schema = schema.append(pa.field(p.name, pa.string()))
+        return pa.RecordBatchReader.from_batches(schema, (add(b) for b in source))
+    return add(source)
+
+
+def _prunable(partition_columns: list[str], partition_by: list, keys: list[str]) -> list[str]:
+    """Partition columns a merge predicate can restrict to the source's values.
+
+    Only columns that are a key, or derived from one, qualify: a matched
+    target row then necessarily sits in the same partition as its source row.
+    """
+    derived_from = {p.name: p.source for p in partition_by or [] if isinstance(p, Partition)}
+    return [c for c in partition_columns if c in keys or derived_from.get(c) in keys]
+
+
+# Above this many distinct source values a column is bounded by min/max instead
+_IN_LIST_MAX = 64
+
+
+def _sql_literal(value) -> str:
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    if isinstance(value, (date, datetime)):
+        return f"'{value.isoformat()}'"
+    return str(value)
+
+
+class _Bounds:
+    """Value bounds of source columns, accumulated batch by batch.
+
+    Per column: min and max, plus the distinct values while there are at most
+    _IN_LIST_MAX of them. predicates() turns these into target-side filters
+    (IN list when small, else a range) that deltalake checks against
+    partition values and file statistics, so the merge only scans target
+    files that can hold a matching row.
+    """
+
+    # Types whose values render as SQL literals deltalake compares correctly
+    _SUPPORTED = (pa.types.is_string, pa.types.is_large_string, pa.types.is_integer, pa.types.is_date32)
+
+    def __init__(self, schema: pa.Schema, columns: list[str]):
+        self.columns = [
+            c for c in columns
+            if any(is_type(schema.field(c).type) for is_type in self._SUPPORTED)
+        ]
+        self.lo, self.hi = {}, {}
+        self.values = {c: set() for c in self.columns}
+        self.nulls = set()
+
+    def update(self, batch: pa.Table | pa.RecordBatch) -> None:
+        for c in self.columns:
+            col = batch.column(c)
+            if col.null_count:
+                self.nulls.add(c)
+            bounds = pc.min_max(col)
+            lo, hi = bounds["min"].as_py(), bounds["max"].as_py()
+            if lo is None:
+                continue
+            self.lo[c] = lo if c not in self.lo else min(self.lo[c], lo)
+            self.hi[c] = hi if c not in self.hi else max(self.hi[c], hi)
+            if self.values[c] is not None:
+                self.values[c].update(pc.unique(col).to_pylist())
+                if len(self.values[c]) > _IN_LIST_MAX:
+                    self.values[c] = None
+
+    def predicates(self, alias: str) -> list[str]:
+        out = []
+        for c in self.columns:
+            if c in self.nulls or c not in self.lo:
+                continue  # the filter would exclude null target values
+            if self.values[c] is not None:
+                in_list = ", ".join(_sql_literal(v) for v in sorted(self.values[c]))
+                out.append(f"{alias}.{c} IN ({in_list})")
+            else:
+                out.append(f"{alias}.{c} >= {_sql_literal(self.lo[c])} AND {alias}.{c} <= {_sql_literal(self.hi[c])}")
+        return out
+
+
+def _same_layout(dt: DeltaTable, names: list[str] | None) -> bool:
+    """Whether `dt` is partitioned by exactly `names` (None and [] both mean unpartitioned)."""
+    return list(dt.metadata().partition_columns or []) == list(names or [])
+
+
+def _recover_swap(uri: str) -> None:
+    """Finish or undo a _swap_in that was interrupted.
+
+    If `<uri>.old` is left over and nothing is at `uri`, the crash came
+    between the two renames: the old table is the only complete copy, so it
+    is moved back (the relayout reruns on the next write that asks for it).
+    If `uri` is in place, only the final delete was missed. Called before
+    every read or write of a table, so a new table is never created while
+    `.old` still holds the data.
+    """
+    fs = get_fs(uri)
+    staged, old = f"{uri}.relayout", f"{uri}.old"
+    if fs.exists(old):
+        if fs.exists(f"{uri}/_delta_log"):
+            fs.rm(old, recursive=True)
+        else:
+            if fs.exists(uri):
+                fs.rm(uri, recursive=True)
+            fs.mv(old, uri, recursive=True)
+            print(f"[relayout] restored {uri} from an interrupted relayout")
+    if fs.exists(staged):
+        fs.rm(staged, recursive=True)
+
+
+def _swap_in(uri: str, data, partition_by: list[str] | None, opts: dict | None) -> None:
+    """Replace the table at `uri` with `data` under a different partition layout.
+
+    deltalake before 1.6 rejects an overwrite that changes partition columns,
+    so the new table is written next to the old one (`<uri>.relayout`) and
+    swapped in by renaming; the old directory is deleted afterwards. The
+    replacement starts a fresh history at version 0. The two renames are not
+    atomic (on S3 each is a copy and delete); _recover_swap repairs a swap
+    interrupted between them.
+    """
+    fs = get_fs(uri)
+    staged, old = f"{uri}.relayout", f"{uri}.old"
+    _recover_swap(uri)
+    write_deltalake(
+        staged,
+        data,
+        partition_by=partition_by,
+        storage_options=opts,
+        commit_properties=_run_commit_properties(),
+    )
+    fs.mv(uri, old, recursive=True)
+    fs.mv(staged, uri, recursive=True)
+    fs.rm(old, recursive=True)
+
+
+def _relayout(dt: DeltaTable, uri: str, name: str, partition_by: list, opts: dict | None) -> DeltaTable:
+    """Rewrite an existing table under a new partition layout.
+
+    Runs once, on the first write that asks for a layout the table doesn't
+    have. Streams the current version into a new table and swaps it in (see
+    _swap_in).
+    """
+    names = _partition_names(partition_by)
+    data = dt.to_pyarrow_dataset()
+    reader = _with_partitions(pa.RecordBatchReader.from_batches(data.schema, data.to_batches()), partition_by)
+    _swap_in(uri, reader, names, opts)
+    print(f"[relayout] {name}: partitioned by {', '.join(names)}")
+    return DeltaTable(uri, storage_options=opts)
+
+
+def _spool(reader: pa.RecordBatchReader, directory: str) -> pa.Table:
+    """Copy a stream to a local Arrow IPC file and return it memory-mapped.
+
+    Lets a merge look at the whole source (its key bounds, which rows are
+    new) before deltalake reads it, while memory stays bounded: the table's
+    buffers are pages of the mapped file, read on demand.
+    """
+    path = os.path.join(directory, "source.arrow")
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, reader.schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+    return pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+
+def _maybe_matched(source: pa.Table, keys: list[str], files: pa.Table) -> pa.Array:
+    """Mask of source rows whose key might already exist in the target.
+
+    Uses only the Delta log: a row is provably new when, for every live data
+    file, one of its key values falls outside that file's min/max statistics
+    (or partition value). A file without statistics on any key could hold
+    anything, so then every row counts as a possible match.
+    """
+    n = len(source)
+    maybe = pc.fill_null(pa.nulls(n, pa.bool_()), False)
+    ranges = []
+    for k in keys:
+        if f"min.{k}" in files.column_names:
+            ranges.append((k, files.column(f"min.{k}").to_pylist(), files.column(f"max.{k}").to_pylist()))
+        elif f"partition.{k}" in files.column_names:
+            values = files.column(f"partition.{k}").to_pylist()
+            ranges.append((k, values, values))
+
+    for i in range(files.num_rows):
+        in_file = None
+        for k, lo, hi in ranges:
+            if lo[i] is None or hi[i] is None:
+                continue
+            col = source.column(k)
+            within = pc.and_(
+                pc.greater_equal(col, pc.cast(pa.scalar(lo[i]), col.type)),
+                pc.less_equal(col, pc.cast(pa.scalar(hi[i]), col.type)),
+            )
+            in_file = within if in_file is None else pc.and_(in_file, within)
+        if in_file is None:
+            return pc.fill_null(pa.nulls(n, pa.bool_()), True)
+        maybe = pc.or_(maybe, in_file)
+    if isinstance(maybe, pa.ChunkedArray):
+        maybe = maybe.combine_chunks()
+    return pc.fill_null(maybe, True)
+
+
+def _rows(table: pa.Table, mask: pa.Array) -> pa.RecordBatchReader:
+    """Stream `table`'s rows where `mask` is true, batch by batch."""
+    def batches():
+        offset = 0
+        for batch in table.to_batches():
+            part = batch.filter(mask.slice(offset, len(batch)))
+            offset += len(batch)
+            if len(part):
+                yield part
+    return pa.RecordBatchReader.from_batches(table.schema, batches())
+
+
 def validate_asset(
     name: str,
     *,
@@ -99,6 +370,7 @@ def validate_asset(
         FileNotFoundError: If asset doesn't exist
     """
     uri = _get_uri(name)
+    _recover_swap(uri)
     opts = _get_opts()
 
     try:
@@ -145,17 +417,7 @@ def validate_asset(
                 report["needs_cleanup"] = True
 
             # Check duplicates
-            import pyarrow.compute as pc
-            if len(keys) == 1:
-                unique_count = len(table[keys[0]].unique())
-            else:
-                combined = pc.binary_join_element_wise(
-                    *[pc.cast(table[k], pa.string()) for k in keys],
-                    "||"
-                )
-                unique_count = len(combined.unique())
-
-            dup_count = len(table) - unique_count
+            dup_count = check_keys(table, keys).duplicates
             if dup_count > 0:
                 report["key_duplicates"] = dup_count
                 report["issues"].append(f"{dup_count} duplicate key combinations")
@@ -182,6 +444,15 @@ def _get_opts() -> dict | None:
     return get_storage_options() if is_cloud() else None
 
 
+def _add_actions(dt: DeltaTable) -> pa.Table:
+    """The Delta log's add actions: one row per live data file, with its stats."""
+    actions = dt.get_add_actions(flatten=True)
+    # deltalake ≥1.0 returns arro3 objects; bridge to pyarrow.
+    if hasattr(actions, "__arrow_c_stream__"):
+        return pa.table(actions)
+    return pa.Table.from_batches([pa.record_batch(actions)])
+
+
 def _target_row_count(dt: DeltaTable) -> int:
     """Sum num_records from the Delta log's add actions.
 
@@ -189,9 +460,7 @@ def _target_row_count(dt: DeltaTable) -> int:
     no data scan. Returns -1 if unavailable so callers can still report.
     """
     try:
-        # deltalake ≥1.0 returns an arro3 RecordBatch; bridge to pyarrow.
-        batch = pa.record_batch(dt.get_add_actions(flatten=True))
-        col = batch.column("num_records")
+        col = _add_actions(dt).column("num_records")
         return int(sum(v for v in col.to_pylist() if v is not None))
     except Exception:
         return -1
@@ -232,71 +501,51 @@ def _log_write_meta(name: str, schema: pa.Schema, row_count: int, mode: str):
     )
 
 
-def _source_hash(source, schema: pa.Schema, target_row_count: int) -> str:
-    """Hash a merge source.
+def _tap(reader: pa.RecordBatchReader, fn) -> pa.RecordBatchReader:
+    """Wrap a stream so `fn(batch)` sees each batch as deltalake consumes it.
 
-    For a Table: hash source rowcount + schema (stable across runs when the
-    source is unchanged).
-    For a RecordBatchReader: the stream has been consumed by deltalake by now,
-    so we fall back to target rowcount + schema. This isn't a source-only
-    fingerprint but it's still a stable descriptor of the written state.
+    An exception from `fn` surfaces inside deltalake's read of the stream,
+    which aborts the write before anything is committed.
     """
-    import hashlib
-    h = hashlib.md5()
-    if isinstance(source, pa.Table):
-        h.update(f"{len(source)}".encode())
-    else:
-        h.update(f"{target_row_count}".encode())
-    h.update(str(schema).encode())
-    return h.hexdigest()[:16]
+    def batches():
+        for batch in reader:
+            fn(batch)
+            yield batch
+    return pa.RecordBatchReader.from_batches(reader.schema, batches())
 
 
-def _validate_keys(table: pa.Table, keys: list[str], name: str):
-    """Validate key columns before merge.
+def _fingerprint(source) -> tuple[Union[pa.Table, pa.RecordBatchReader], ContentHasher]:
+    """Content hash of a write source.
 
-    Checks:
-    1. Key columns exist
-    2. Key columns have no nulls
-    3. Key combination is unique (no duplicates)
+    Tables are hashed up front; readers are tapped so their batches are hashed
+    as they stream, and the digest is complete once the write has consumed
+    them. Either way the hash covers source content, not just its row count.
     """
-    # Check columns exist
-    for k in keys:
-        if k not in table.column_names:
-            raise ValueError(f"[{name}] Key column '{k}' not found. Columns: {table.column_names}")
-
-    # Check for nulls in key columns
-    for k in keys:
-        null_count = table[k].null_count
-        if null_count > 0:
-            raise ValueError(f"[{name}] Key column '{k}' has {null_count} nulls. Merge keys cannot be null.")
-
-    # Check uniqueness - group by keys and look for duplicates
-    if len(keys) == 1:
-        # Single key - use value_counts
-        key_col = table[keys[0]]
-        unique_count = len(key_col.unique())
-        if unique_count != len(table):
-            dup_count = len(table) - unique_count
-            raise ValueError(
-                f"[{name}] Key '{keys[0]}' has {dup_count} duplicate values. "
-                f"Merge key must be unique. Check your data or add more columns to key."
-            )
-    else:
-        # Composite key - need to check combination
-        import pyarrow.compute as pc
-
-        # Concatenate key columns as strings for uniqueness check
-        combined = pc.binary_join_element_wise(
-            *[pc.cast(table[k], pa.string()) for k in keys],
-            "||"
+    hasher = ContentHasher()
+    if isinstance(source, pa.RecordBatchReader):
+        return _tap(source, hasher.update), hasher
+    hasher.update(source)
+    return source, hasher
+
+
+def _validate_keys(table: pa.Table | pa.RecordBatch, keys: list[str], name: str):
+    """Validate key columns before merge: they exist, have no nulls, and
+    the key combination is unique (see testing.check_keys)."""
+    result = check_keys(table, keys)
+    if result.missing:
+        raise ValueError(f"[{name}] Key column '{result.missing[0]}' not found. Columns: {table.column_names}")
+    if result.nulls:
+        k, null_count = next(iter(result.nulls.items()))
+        raise ValueError(f"[{name}] Key column '{k}' has {null_count} nulls. Merge keys cannot be null.")
+    if result.duplicates:
+        if len(keys) == 1:
+            what = f"Key '{keys[0]}' has {result.duplicates} duplicate values"
+        else:
+            what = f"Key {keys} has {result.duplicates} duplicate combinations"
+        raise ValueError(
+            f"[{name}] {what}, e.g. {result.examples}. "
+            f"Merge key must be unique. Check your data or add more columns to key."
         )
-        unique_count = len(combined.unique())
-        if unique_count != len(table):
-            dup_count = len(table) - unique_count
-            raise ValueError(
-                f"[{name}] Key {keys} has {dup_count} duplicate combinations. "
-                f"Merge key must be unique. Check your data or add more columns to key."
-            )
 
 
 def merge(
@@ -304,7 +553,7 @@ def merge(
     name: str,
     *,
     key: Union[str, list[str]],
-    partition_by: list[str] = None,
+    partition_by: list[Union[str, Partition]] = None,
     validate: bool = True
 ) -> "WriteResult":
     """Upsert data into a Delta table.
@@ -317,24 +566,31 @@ def merge(
         source: PyArrow Table or RecordBatchReader. Readers stream batches
             through deltalake without materializing the full dataset in
             memory — use this for large sources via DuckDB's
-            fetch_record_batch() or similar. validate=True is incompatible
-            with readers (would consume the stream).
+            fetch_record_batch() or similar.
         name: Dataset name
         key: Column(s) that uniquely identify a record
-        partition_by: Optional columns to partition by
-        validate: Check key uniqueness before merge (default True).
-            Must be False for RecordBatchReader sources.
+        partition_by: Optional columns to partition by, plain or derived
+            (e.g. [by_month("date")]). An existing table with a different
+            layout is rewritten under this one first.
+        validate: Check key nulls/uniqueness (default True). Tables are
+            checked up front; readers are checked batch by batch as they
+            stream, so uniqueness only holds within each batch.
+
+    The target scan is narrowed to the source's bounds: each key column (and
+    each partition derived from one) is restricted to its source values, or
+    their min/max range when there are many. A merge of the last 7 days then
+    only reads files whose date statistics overlap those days.
+
+    Source rows whose key is provably absent from the target — judged from
+    the per-file key statistics in the Delta log, e.g. dates past the
+    table's last one — skip MERGE and are appended; only the rest are
+    merged. The two are separate commits. Streamed sources are spooled to a
+    local Arrow IPC file so the source can be read more than once.
 
     Returns:
         WriteResult with uri, version, hash, rows.
     """
     is_reader = isinstance(source, pa.RecordBatchReader)
-    if is_reader and validate:
-        raise ValueError(
-            "merge(): validate=True cannot be combined with a RecordBatchReader "
-            "source — the stream would be consumed by validation. Pass "
-            "validate=False or materialize to a pa.Table first."
-        )
 
     if not is_reader and len(source) == 0:
         print(f"[merge] {name}: no data to write")
@@ -343,14 +599,22 @@ def merge(
     # Normalize key to list
     keys = [key] if isinstance(key, str) else key
 
-    # Validate keys (table-only)
+    # Validate keys: whole table up front, readers per batch as they stream
     if validate:
-        _validate_keys(source, keys, name)
+        if is_reader:
+            # Memory stays bounded by one batch, so uniqueness is checked
+            # within each batch only — emit key-disjoint batches.
+            source = _tap(source, lambda batch: _validate_keys(batch, keys, name))
+        else:
+            _validate_keys(source, keys, name)
 
+    source, hasher = _fingerprint(source)
+    source = _with_partitions(source, partition_by)
     schema = source.schema
     column_names = [f.name for f in schema]
 
     uri = _get_uri(name)
+    _recover_swap(uri)
     opts = _get_opts()
 
     # Probe for table existence. If it doesn't exist yet, create it via
@@ -370,38 +634,72 @@ def merge(
             uri,
             source,
             mode="overwrite",
-            partition_by=partition_by,
+            partition_by=_partition_names(partition_by),
             storage_options=opts,
             commit_properties=_run_commit_properties(),
         )
         dt = DeltaTable(uri, storage_options=opts)
         new_count = _target_row_count(dt)
         version = dt.version()
-        h = _source_hash(source, schema, new_count)
+        h = hasher.hexdigest()
         _log_write_meta(name, schema, new_count, "merge (created)")
     else:
-        # Build merge predicate
-        predicate = " AND ".join([f"target.{k} = source.{k}" for k in keys])
-        updates = {col: f"source.{col}" for col in column_names}
-
-        dt.merge(
-            source=source,
-            predicate=predicate,
-            source_alias="source",
-            target_alias="target",
-            commit_properties=_run_commit_properties(),
-        ).when_matched_update(
-            updates=updates
-        ).when_not_matched_insert(
-            updates=updates
-        ).execute()
+        if partition_by and not _same_layout(dt, _partition_names(partition_by)):
+            dt = _relayout(dt, uri, name, partition_by, opts)
+
+        with tempfile.TemporaryDirectory(prefix="merge-") as spool_dir:
+            if is_reader:
+                source = _spool(source, spool_dir)
+
+            # Rows whose key can't be in the target are appended; only the
+            # rest go through the (join-based) MERGE
+            maybe = _maybe_matched(source, keys, _add_actions(dt))
+            overlapping = pc.sum(maybe).as_py() or 0
+            appended = len(source) - overlapping
+            if appended:
+                write_deltalake(
+                    dt,
+                    _rows(source, pc.invert(maybe)),
+                    mode="append",
+                    storage_options=opts,
+                    commit_properties=_run_commit_properties(),
+                )
+                dt = DeltaTable(uri, storage_options=opts)
+
+            if overlapping:
+                # Build merge predicate: key equality, narrowed to the
+                # overlapping rows' key bounds and partitions so the target
+                # scan skips everything they can't match
+                prune = _prunable(dt.metadata().partition_columns, partition_by, keys)
+                bounds = _Bounds(schema, keys + [c for c in prune if c not in keys])
+                for batch in _rows(source, maybe):
+                    bounds.update(batch)
+                predicate = " AND ".join(
+                    [f"target.{k} = source.{k}" for k in keys] + bounds.predicates("target")
+                )
+                updates = {col: f"source.{col}" for col in column_names}
+
+                dt.merge(
+                    source=_rows(source, maybe),
+                    predicate=predicate,
+                    source_alias="source",
+                    target_alias="target",
+                    commit_properties=_run_commit_properties(),
+                ).when_matched_update(
+                    updates=updates
+                ).when_not_matched_insert(
+                    updates=updates
+                ).execute()
 
         # Rowcount from Delta log (parquet footers), not by materializing target.
-        # Hash on source rowcount+schema — stable fingerprint for unchanged inputs.
+        # Hash on source content — stable fingerprint for unchanged inputs.
         new_count = _target_row_count(dt)
         version = dt.version()
-        h = _source_hash(source, schema, new_count)
-        _log_write_meta(name, schema, new_count, f"merge → {new_count:,} total")
+        h = hasher.hexdigest()
+        _log_write_meta(
+            name, schema, new_count,
+            f"merge ({appended:,} appended, {overlapping:,} merged) → {new_count:,} total",
+        )
 
     record_write(f"subsets/{name}", version=version, hash=h)
     return WriteResult(uri=uri, version=version, hash=h, rows=new_count)
@@ -411,7 +709,7 @@ def overwrite(
     source: Union[pa.Table, pa.RecordBatchReader],
     name: str,
     *,
-    partition_by: list[str] = None
+    partition_by: list[Union[str, Partition]] = None
 ) -> "WriteResult":
     """Replace entire Delta table with new data.
 
@@ -435,25 +733,35 @@ def overwrite(
         print(f"[overwrite] {name}: no data to write")
         return None
 
+    source, hasher = _fingerprint(source)
+    source = _with_partitions(source, partition_by)
     schema = source.schema
 
     uri = _get_uri(name)
+    _recover_swap(uri)
     opts = _get_opts()
+    names = _partition_names(partition_by)
 
-    write_deltalake(
-        uri,
-        source,
-        mode="overwrite",
-        partition_by=partition_by,
-        storage_options=opts,
-        schema_mode="overwrite",
-        commit_properties=_run_commit_properties(),
-    )
+    if (
+        DeltaTable.is_deltatable(uri, storage_options=opts)
+        and not _same_layout(DeltaTable(uri, storage_options=opts), names)
+    ):
+        _swap_in(uri, source, names, opts)
+    else:
+        write_deltalake(
+            uri,
+            source,
+            mode="overwrite",
+            partition_by=names,
+            storage_options=opts,
+            schema_mode="overwrite",
+            commit_properties=_run_commit_properties(),
+        )
 
     dt = DeltaTable(uri, storage_options=opts)
     version = dt.version()
     new_count = _target_row_count(dt)
-    h = _source_hash(source, schema, new_count)
+    h = hasher.hexdigest()
 
     _log_write_meta(name, schema, new_count, "overwrite")
     record_write(f"subsets/{name}", version=version, hash=h)
@@ -464,7 +772,7 @@ def append(
     source: Union[pa.Table, pa.RecordBatchReader],
     name: str,
     *,
-    partition_by: list[str] = None
+    partition_by: list[Union[str, Partition]] = None
 ) -> "WriteResult":
     """Append data to a Delta table.
 
@@ -489,16 +797,19 @@ def append(
     if partition_by is None:
         print(f"⚠️  Warning: append() without partition_by makes cleanup difficult")
 
+    source, hasher = _fingerprint(source)
+    source = _with_partitions(source, partition_by)
     schema = source.schema
 
     uri = _get_uri(name)
+    _recover_swap(uri)
     opts = _get_opts()
 
     write_deltalake(
         uri,
         source,
         mode="append",
-        partition_by=partition_by,
+        partition_by=_partition_names(partition_by),
         storage_options=opts,
         schema_mode="merge",  # Allow schema evolution for append
         commit_properties=_run_commit_properties(),
@@ -507,8 +818,78 @@ def append(
     dt = DeltaTable(uri, storage_options=opts)
     version = dt.version()
     new_count = _target_row_count(dt)
-    h = _source_hash(source, schema, new_count)
+    h = hasher.hexdigest()
 
     _log_write_meta(name, schema, new_count, "append")
     record_write(f"subsets/{name}", version=version, hash=h)
     return WriteResult(uri=uri, version=version, hash=h, rows=new_count)
+
+
+# =============================================================================
+# Maintenance
+# =============================================================================
+
+def _open_existing(name: str, op: str) -> DeltaTable | None:
+    try:
+        uri = _get_uri(name)
+        _recover_swap(uri)
+        return DeltaTable(uri, storage_options=_get_opts())
+    except Exception as e:
+        if not _is_table_not_found(e):
+            raise
+        print(f"[{op}] {name}: no table yet")
+        return None
+
+
+def optimize(
+    name: str,
+    *,
+    z_order: list[str] = None,
+    target_size: int = None
+) -> dict | None:
+    """Compact a table's small files, Z-ordering them when `z_order` is given.
+
+    Rows are unchanged; only files are rewritten. Compaction bin-packs each
+    partition's files up to `target_size` bytes (default: the table's
+    delta.targetFileSize, or 100MB). Z-ordering also sorts rows along the
+    given columns, so file statistics on them become tight and filters like
+    coin_id = 'bitcoin' skip most files.
+
+    Returns deltalake's optimize metrics, or None if the table doesn't exist.
+    """
+    dt = _open_existing(name, "optimize")
+    if dt is None:
+        return None
+
+    if z_order:
+        metrics = dt.optimize.z_order(
+            z_order, target_size=target_size, commit_properties=_run_commit_properties()
+        )
+    else:
+        metrics = dt.optimize.compact(target_size=target_size, commit_properties=_run_commit_properties())
+
+    how = f"z-ordered by {', '.join(z_order)}" if z_order else "compacted"
+    print(f"[optimize] {name}: {how}, {metrics['numFilesRemoved']} files → {metrics['numFilesAdded']}")
+    return metrics
+
+
+def vacuum(name: str, *, retention_hours: int = None) -> list[str] | None:
+    """Delete data files no longer referenced by a table for `retention_hours`.
+
+    Defaults to the table's delta.deletedFileRetentionDuration (7 days);
+    shorter retention is refused. Versions older than the retention window
+    can no longer be time-travelled to afterwards.
+
+    Returns the deleted files, or None if the table doesn't exist.
+    """
+    dt = _open_existing(name, "vacuum")
+    if dt is None:
+        return None
+
+    removed = dt.vacuum(
+        retention_hours=retention_hours,
+        dry_run=False,
+        commit_properties=_run_commit_properties(),
+    )
+    print(f"[vacuum] {name}: deleted {len(removed)} unreferenced files")
+    return removed
@@ -0,0 +1,145 @@
+"""On-disk HTTP response cache with conditional revalidation.
+
+Optional and off by default: set HTTP_CACHE_DIR (or configure_http(cache_dir=...))
+to turn it on. Re-runs, crash retries and dev iterations then reuse identical
+GET responses instead of re-downloading them — and, for rate-limited APIs,
+instead of spending a token on them.
+
+- Entries are keyed by method + full URL (query params included, sorted)
+  and stored in one SQLite file, safe across threads and forked node
+  processes.
+- An entry younger than `ttl_s` is served without touching the network.
+- Past the TTL, the next request carries If-None-Match / If-Modified-Since
+  from the stored ETag / Last-Modified; a 304 is answered from the cache.
+- Total body size is bounded by `max_bytes`; least recently used entries go
+  first.
+
+Served responses carry `response.extensions["cache"]`: "hit" (fresh, no
+request made) or "revalidated" (304 from the server). Fresh network
+responses don't have the key.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import httpx
+
+# Hop-by-hop / encoding headers that no longer describe the stored (decoded) body
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+class ResponseCache:
+    """SQLite-backed LRU store of successful GET responses.
+
+    Args:
+        path: Cache directory; the database is `<path>/responses.sqlite`.
+        ttl_s: Seconds an entry is served without revalidation.
+        max_bytes: Upper bound on stored body bytes.
+    """
+
+    def __init__(self, path: str | Path, *, ttl_s: float = 3600.0, max_bytes: int = 512 * 1024 * 1024):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.path / "responses.sqlite"
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread, and never one inherited across fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, status INTEGER, headers TEXT, body BLOB,"
+                " etag TEXT, last_modified TEXT, stored_at REAL, accessed_at REAL, size INTEGER)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (accessed_at)")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @staticmethod
+    def key(method: str, url: str, params=None) -> str:
+        # Sorted query so param order doesn't split entries
+        u = httpx.URL(url, params=params)
+        return f"{method.upper()} {u.copy_with(params=sorted(u.params.multi_items()))}"
+
+    def lookup(self, key: str) -> dict | None:
+        """Stored entry for `key` (with a `fresh` flag), or None."""
+        row = self._conn().execute(
+            "SELECT status, headers, body, etag, last_modified, stored_at FROM responses WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        self._conn().execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        status, headers, body, etag, last_modified, stored_at = row
+        return {
+            "status": status,
+            "headers": json.loads(headers),
+            "body": body,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": now - stored_at < self.ttl_s,
+        }
+
+    def store(self, key: str, response: httpx.Response) -> None:
+        body = response.content
+        if len(body) > self.max_bytes:
+            return
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in _DROP_HEADERS}
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, response.status_code, json.dumps(headers), body,
+             response.headers.get("etag"), response.headers.get("last-modified"),
+             now, now, len(body)),
+        )
+        self._evict(conn)
+
+    def refresh(self, key: str) -> None:
+        """Restart an entry's TTL after the server confirmed it unchanged (304)."""
+        now = time.time()
+        self._conn().execute(
+            "UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key)
+        )
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        victims, freed = [], 0
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+    @staticmethod
+    def conditional_headers(entry: dict) -> dict:
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    @staticmethod
+    def to_response(entry: dict, method: str, url: str, params, how: str) -> httpx.Response:
+        return httpx.Response(
+            entry["status"],
+            headers=entry["headers"],
+            content=entry["body"],
+            request=httpx.Request(method, url, params=params),
+            extensions={"cache": how},
+        )
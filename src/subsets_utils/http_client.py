@@ -2,11 +2,17 @@ import os
 import httpx
 import time
 from . import debug
+from .http_cache import ResponseCache
 
 _client = None
+_cache = None
 _client_config = {
     'timeout': int(os.environ.get('HTTP_TIMEOUT', '30')),
-    'headers': {'User-Agent': os.environ.get('HTTP_USER_AGENT', 'DataIntegrations/1.0')}
+    'headers': {'User-Agent': os.environ.get('HTTP_USER_AGENT', 'DataIntegrations/1.0')},
+    # Response cache (GET only) — disabled unless a directory is set
+    'cache_dir': os.environ.get('HTTP_CACHE_DIR') or None,
+    'cache_ttl_s': float(os.environ.get('HTTP_CACHE_TTL_S', '3600')),
+    'cache_max_bytes': int(float(os.environ.get('HTTP_CACHE_MAX_MB', '512')) * 1024 * 1024),
 }
 
 
@@ -23,6 +29,19 @@ def _get_or_create_client() -> httpx.Client:
     return _client
 
 
+def _get_cache() -> ResponseCache | None:
+    global _cache
+
+    if _cache is None and _client_config.get('cache_dir'):
+        _cache = ResponseCache(
+            _client_config['cache_dir'],
+            ttl_s=_client_config['cache_ttl_s'],
+            max_bytes=_client_config['cache_max_bytes'],
+        )
+
+    return _cache
+
+
 def _logged_request(method: str, url: str, **kwargs) -> httpx.Response:
     """Execute HTTP request with logging if ENABLE_LOGGING is set."""
     client = _get_or_create_client()
@@ -42,8 +61,54 @@ def _logged_request(method: str, url: str, **kwargs) -> httpx.Response:
         debug.log_http_request(method, url, status, duration_ms=duration_ms, error=error)
 
 
+def _log_hit(url: str) -> None:
+    # Not a request: http_requests.csv counts only what went over the network
+    debug.log_metric("http_cache_hit", 1, method="GET", url=url)
+
+
 def get(url: str, **kwargs) -> httpx.Response:
-    return _logged_request("GET", url, **kwargs)
+    """GET through the response cache when one is configured.
+
+    Fresh entries are returned without a request; stale ones are revalidated
+    with If-None-Match / If-Modified-Since and a 304 is answered from the
+    cache. Check `response.extensions.get("cache")` for "hit"/"revalidated".
+    """
+    cache = _get_cache()
+    if cache is None:
+        return _logged_request("GET", url, **kwargs)
+
+    params = kwargs.get("params")
+    key = cache.key("GET", url, params)
+    entry = cache.lookup(key)
+    if entry is not None and entry["fresh"]:
+        _log_hit(url)
+        return cache.to_response(entry, "GET", url, params, "hit")
+
+    if entry is not None:
+        kwargs["headers"] = {**cache.conditional_headers(entry), **(kwargs.get("headers") or {})}
+    response = _logged_request("GET", url, **kwargs)
+    if response.status_code == 304 and entry is not None:
+        cache.refresh(key)
+        return cache.to_response(entry, "GET", url, params, "revalidated")
+    if response.status_code == 200:
+        cache.store(key, response)
+    return response
+
+
+def cached(url: str, params=None) -> httpx.Response | None:
+    """Fresh cached GET response, without any request — None on a miss.
+
+    Lets rate-limited callers skip taking a token for requests the cache
+    will answer anyway.
+    """
+    cache = _get_cache()
+    if cache is None:
+        return None
+    entry = cache.lookup(cache.key("GET", url, params))
+    if entry is None or not entry["fresh"]:
+        return None
+    _log_hit(url)
+    return cache.to_response(entry, "GET", url, params, "hit")
 
 
 def post(url: str, **kwargs) -> httpx.Response:
@@ -63,8 +128,9 @@ def get_client() -> httpx.Client:
 
 
 def configure_http(**config):
-    global _client_config, _client
+    global _client_config, _client, _cache
     _client_config.update(config)
+    _cache = None
     if _client:
         _client.close()
         _client = None
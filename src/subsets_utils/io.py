@@ -96,13 +96,49 @@ def _delete(uri: str) -> None:
 # =============================================================================
 
 def data_hash(table: pa.Table) -> str:
-    """Fast hash based on row count + schema. Use with state to detect changes."""
+    """Fast hash based on row count + schema. Use with state to detect changes.
+
+    Blind to value changes that keep the row count — use content_hash() when
+    an unchanged row count does not imply unchanged data.
+    """
     h = hashlib.md5()
     h.update(f"{len(table)}".encode())
     h.update(str(table.schema).encode())
     return h.hexdigest()[:16]
 
 
+class ContentHasher:
+    """Incremental content fingerprint over Arrow data.
+
+    Feeds each record batch's IPC encoding (schema + raw column buffers, no
+    Python conversion) into BLAKE2b, so large inputs can be hashed batch by
+    batch as they stream past. Equal data built the same way hashes equal;
+    a different chunking of the same rows may not, which errs towards
+    "changed" and never towards a false "unchanged".
+    """
+
+    def __init__(self):
+        self._h = hashlib.blake2b(digest_size=16)
+        self.rows = 0
+
+    def update(self, data: pa.Table | pa.RecordBatch) -> None:
+        batches = data.to_batches() if isinstance(data, pa.Table) else [data]
+        for batch in batches:
+            self._h.update(batch.schema.serialize())
+            self._h.update(batch.serialize())
+            self.rows += batch.num_rows
+
+    def hexdigest(self) -> str:
+        return self._h.hexdigest()
+
+
+def content_hash(data: pa.Table | pa.RecordBatch) -> str:
+    """Content fingerprint of a table or batch. See ContentHasher."""
+    h = ContentHasher()
+    h.update(data)
+    return h.hexdigest()
+
+
 def raw_parquet_hash(asset_id: str) -> str | None:
     """Hash a raw parquet by footer metadata only — no data scan.
 
@@ -349,6 +385,46 @@ def raw_parquet_localpath(asset_id: str):
             pass
 
 
+# =============================================================================
+# Raw Arrow IPC (compressed columnar blobs)
+# =============================================================================
+
+def save_raw_arrow(data: pa.Table, asset_id: str, compression: str | None = "zstd") -> str:
+    """Save a PyArrow table as an Arrow IPC file (.arrow).
+
+    For numeric series that would otherwise be JSON text: column buffers are
+    written as-is, zstd-compressed by default (None for uncompressed).
+    """
+    from .tracking import record_write
+    if hasattr(data, "read_all"):
+        data = data.read_all()
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.ipc.new_file(sink, data.schema, options=options) as writer:
+        writer.write_table(data)
+    uri = raw_uri(asset_id, "arrow")
+    _write_bytes(uri, sink.getvalue().to_pybytes())
+    print(f"  -> Saved {asset_id}.arrow ({data.num_rows:,} rows)")
+    record_write(f"raw/{asset_id}.arrow")
+    return uri
+
+
+def load_raw_arrow(asset_id: str) -> pa.Table:
+    """Load an Arrow IPC raw asset as a PyArrow table.
+
+    Buffers are read straight into Arrow arrays — no parsing, no Python
+    objects. Uncompressed files are zero-copy views of the bytes read;
+    compressed ones are decompressed buffer by buffer.
+    """
+    from .tracking import record_read
+    uri = raw_uri(asset_id, "arrow")
+    data = _read_with_mirror_fallback(uri, mirror_raw_path(asset_id, "arrow"))
+    if data is None:
+        raise FileNotFoundError(f"Raw arrow '{asset_id}' not found at {uri}")
+    record_read(f"raw/{asset_id}.arrow")
+    return pa.ipc.open_file(pa.py_buffer(data)).read_all()
+
+
 # =============================================================================
 # Streaming helpers — for datasets too big to fit in memory
 #
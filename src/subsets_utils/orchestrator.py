@@ -330,11 +330,14 @@ class DAG:
         return proc, pipe_r
 
     def _collect_result(self, proc: multiprocessing.Process, pipe_r) -> dict:
-        """Join a child proc and read the result dict it sent. If the child
+        """Read the result dict a child sent, then join it. If the child
         died before sending (OOM SIGKILL, segfault, etc.), synthesize a failure
-        result based on its exit code."""
-        proc.join()
+        result based on its exit code.
 
+        The pipe is drained BEFORE joining: a result larger than the OS pipe
+        buffer blocks the child in send_bytes() until someone reads it, so
+        joining first would deadlock on nodes with many tracked I/O records.
+        """
         result: dict | None = None
         if pipe_r.poll():
             try:
@@ -346,6 +349,8 @@ class DAG:
         except Exception:
             pass
 
+        proc.join()
+
         if result is not None:
             return result
 
@@ -552,14 +557,19 @@ class DAG:
             submit_more()
 
             while in_flight:
-                # Wait for any child to exit. We poll on a timeout so the
-                # SIGTERM-set stop_submitting flag is observed promptly.
-                sentinels = [p.sentinel for p in in_flight]
-                ready = multiprocessing.connection.wait(sentinels, timeout=1.0)
-
-                # Map sentinels back to processes. multiprocessing.connection.wait
-                # returns the sentinel objects; we match by identity.
-                done_procs = [p for p in list(in_flight) if p.sentinel in ready]
+                # Wait for any child to exit or start sending its result (a
+                # large result keeps the child alive until we read it). We poll
+                # on a timeout so the SIGTERM-set stop_submitting flag is
+                # observed promptly.
+                waitables = [p.sentinel for p in in_flight] + [r for _, r in in_flight.values()]
+                ready = multiprocessing.connection.wait(waitables, timeout=1.0)
+
+                # Map sentinels/pipes back to processes. multiprocessing.connection.wait
+                # returns the objects it was given; we match by identity.
+                done_procs = [
+                    p for p in list(in_flight)
+                    if p.sentinel in ready or in_flight[p][1] in ready
+                ]
                 for proc in done_procs:
                     task_id, _ = in_flight[proc]
                     result = collect_one(proc)
@@ -588,9 +598,12 @@ class DAG:
                 deadline = time.monotonic() + drain_timeout
                 while in_flight and time.monotonic() < deadline:
                     remaining = max(0.0, deadline - time.monotonic())
-                    sentinels = [p.sentinel for p in in_flight]
-                    ready = multiprocessing.connection.wait(sentinels, timeout=remaining)
-                    for proc in [p for p in list(in_flight) if p.sentinel in ready]:
+                    waitables = [p.sentinel for p in in_flight] + [r for _, r in in_flight.values()]
+                    ready = multiprocessing.connection.wait(waitables, timeout=remaining)
+                    for proc in [
+                        p for p in list(in_flight)
+                        if p.sentinel in ready or in_flight[p][1] in ready
+                    ]:
                         collect_one(proc)
 
                 # Anyone still alive: SIGTERM, then SIGKILL.
@@ -0,0 +1,215 @@
+"""Token-bucket rate limiting for API-bound nodes.
+
+One bucket is shared by every caller of an API (threads included), so a
+node can keep several requests in flight without exceeding the provider's
+calls-per-period budget. Tokens refill continuously; `acquire()` reserves
+the next token and sleeps until it is due, which spaces calls evenly and
+hits the permitted rate exactly regardless of request latency.
+
+AdaptiveTokenBucket adds AIMD control for providers whose real limit is
+unknown: the rate creeps up while calls succeed, halves on a 429, and the
+bucket pauses for whatever Retry-After the server sent.
+
+Buckets created with `shared=True` keep their state in shared memory behind
+a process lock. The orchestrator forks one child per node after importing
+every node module, so a shared bucket created at import time (module level)
+is one budget for all nodes running in parallel under DAG_PARALLELISM > 1.
+
+Usage:
+    from subsets_utils.rate_limit import TokenBucket
+
+    bucket = TokenBucket(calls=30, period=60)
+
+    def fetch(url):
+        bucket.acquire()
+        return get(url)
+"""
+
+import multiprocessing
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from . import debug
+
+
+class _Slot:
+    """Bucket field kept in `_state`, so a shared bucket's fields live in shared memory."""
+
+    def __init__(self, index: int):
+        self.index = index
+
+    def __get__(self, obj, owner=None):
+        return self if obj is None else obj._state[self.index]
+
+    def __set__(self, obj, value) -> None:
+        obj._state[self.index] = value
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    Reservations may drive the token count negative: each caller takes its
+    token immediately and sleeps for the debt it created, so concurrent
+    callers queue fairly (first to reserve, first to go) without holding
+    the lock while they wait.
+
+    Args:
+        calls: Tokens granted per `period`.
+        period: Refill period in seconds.
+        capacity: Maximum burst. Defaults to 1 — calls are spaced
+            `period / calls` apart, so no sliding window of `period`
+            seconds ever sees more than `calls` requests.
+        shared: Keep state in shared memory so processes forked after
+            construction draw from the same bucket (threads still share it
+            either way). time.monotonic() is system-wide, so timestamps
+            agree across processes.
+    """
+
+    rate = _Slot(0)  # tokens per second
+    _tokens = _Slot(1)
+    _last = _Slot(2)
+
+    def __init__(self, calls: float, period: float = 60.0, capacity: float = 1.0, *, shared: bool = False):
+        if calls <= 0 or period <= 0:
+            raise ValueError(f"TokenBucket needs positive calls/period, got {calls}/{period}")
+        if shared:
+            ctx = multiprocessing.get_context("fork")
+            self._state = ctx.RawArray("d", 4)
+            self._lock = ctx.Lock()
+        else:
+            self._state = [0.0] * 4
+            self._lock = threading.Lock()
+        self.rate = calls / period
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until it is available. Returns seconds waited."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def refund(self) -> None:
+        """Return a token taken for a call that didn't count (e.g. answered by a cache)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + 1)
+
+    @property
+    def calls_per_minute(self) -> float:
+        return self.rate * 60
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """Token bucket whose rate is tuned by AIMD from the server's responses.
+
+    Call `on_success()` after every accepted request and `on_throttle()` on
+    a 429. Successes add `increase` calls/minute for each minute's worth of
+    calls at the current rate; a throttle multiplies the rate by `decrease`
+    and pauses the bucket for `retry_after` seconds — callers already
+    waiting are pushed back too, so no request fires into a known lockout.
+    Throttles arriving during a pause (from requests already in flight when
+    the first 429 landed) do not cut the rate again.
+
+    Args:
+        calls: Starting tokens per `period`.
+        period: Refill period in seconds.
+        min_calls: Floor for the adapted rate, per `period`.
+        max_calls: Ceiling for the adapted rate, per `period`.
+        increase: Calls per `period` gained per `period` of clean calls.
+        decrease: Multiplicative rate cut on a throttle.
+        name: Label for the rate metric.
+        shared: See TokenBucket. The adapted rate and any pause are shared too.
+    """
+
+    _paused_until = _Slot(3)
+
+    def __init__(
+        self,
+        calls: float,
+        period: float = 60.0,
+        *,
+        min_calls: float = 1.0,
+        max_calls: float | None = None,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        name: str = "api",
+        shared: bool = False,
+    ):
+        super().__init__(calls, period, shared=shared)
+        self.period = period
+        self.min_rate = min_calls / period
+        self.max_rate = (max_calls if max_calls is not None else calls) / period
+        self.increase = increase / period
+        self.decrease = decrease
+        self.name = name
+        self._paused_until = 0.0
+
+    def _set_rate(self, rate: float, event: str) -> float | None:
+        """Clamp and store a new rate (caller holds the lock). Returns it if it should be logged."""
+        old = self.rate
+        self.rate = min(self.max_rate, max(self.min_rate, rate))
+        # Log on throttles and whenever the rate crosses a whole call/minute
+        if event != "success" or int(old * 60) != int(self.rate * 60):
+            return self.rate
+        return None
+
+    def _log_rate(self, rate: float | None, event: str) -> None:
+        # Called after the lock is released: metric logging is file I/O, and
+        # the lock is shared with every forked node
+        if rate is not None:
+            debug.log_metric("rate_limit_calls_per_minute", round(rate * 60, 3),
+                             limiter=self.name, event=event)
+
+    def on_success(self) -> None:
+        with self._lock:
+            # One period's worth of calls at the current rate earns `increase`
+            rate = self._set_rate(self.rate + self.increase / (self.rate * self.period), "success")
+        self._log_rate(rate, "success")
+
+    def on_throttle(self, retry_after: float | None = None) -> None:
+        """Back off after a 429. `retry_after` is the server's reset delay in seconds."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return
+            self._refill(now)
+            rate = self._set_rate(self.rate * self.decrease, "throttle")
+            pause = retry_after if retry_after is not None else 1 / self.rate
+            # Start the refill clock at the end of the pause: the next refill
+            # sees a negative elapsed time, i.e. a debt that callers sleep off.
+            self._tokens = min(self._tokens, 0.0)
+            self._last = now + pause
+            self._paused_until = now + pause
+        self._log_rate(rate, "throttle")
+        print(f"  Rate limited — pausing {pause:.0f}s, {self.name} rate now "
+              f"{self.calls_per_minute:.1f}/min")
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
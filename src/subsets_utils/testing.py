@@ -25,68 +25,153 @@ Usage in asset test.py:
 
         # Value range validations
         assert_positive(table, "value")
+
+Row-level checks can also go in the validate() schema, which evaluates them
+all in a single pass (and streams, for RecordBatchReader inputs):
+
+    reader = validate(reader, {
+        "columns": {...},
+        "unique": ["year", "country"],
+        "formats": {"year": "year"},
+        "ranges": {"value": (0, None)},
+        "allowed": {"country": {"BE", "NL"}},
+    })
+    merge(reader, ...)  # checks run as merge consumes the stream
 """
 
-import re
+from dataclasses import dataclass, field
 import pyarrow as pa
+import pyarrow.compute as pc
+
+
+# =============================================================================
+# Key Integrity
+# =============================================================================
+
+@dataclass
+class KeyCheck:
+    """Result of check_keys(). `ok` when every key column exists, has no
+    nulls, and no key combination repeats."""
+    keys: list[str]
+    missing: list[str] = field(default_factory=list)
+    nulls: dict[str, int] = field(default_factory=dict)
+    duplicates: int = 0  # rows beyond the first of each repeated key
+    examples: list[dict] = field(default_factory=list)  # repeated keys, with counts
+
+    @property
+    def ok(self) -> bool:
+        return not (self.missing or self.nulls or self.duplicates)
+
+
+def check_keys(table: pa.Table | pa.RecordBatch, keys: str | list[str], samples: int = 5) -> KeyCheck:
+    """Check key columns for presence, nulls and uniqueness, on native Arrow types.
+
+    Uniqueness is a hash group-by count over the key columns as they are
+    (dictionary-encoded, numeric, string), so no combined key column is
+    built and nothing becomes Python objects except up to `samples` repeated
+    keys. Shared by validate()'s "unique" check and delta.merge().
+    """
+    keys = [keys] if isinstance(keys, str) else list(keys)
+    result = KeyCheck(keys)
+
+    result.missing = [k for k in keys if k not in table.column_names]
+    if result.missing:
+        return result
+
+    for k in keys:
+        if table.column(k).null_count:
+            result.nulls[k] = table.column(k).null_count
+
+    if isinstance(table, pa.RecordBatch):
+        table = pa.Table.from_batches([table])
+    counts = table.select(keys).group_by(keys, use_threads=False).aggregate([([], "count_all")])
+    counts = counts.rename_columns(keys + ["count"])
+    result.duplicates = len(table) - len(counts)
+    if result.duplicates:
+        repeated = counts.filter(pc.greater(counts.column("count"), 1))
+        result.examples = repeated.slice(0, samples).to_pylist()
+    return result
+
+
+# =============================================================================
+# Vectorized Helpers
+# =============================================================================
+
+# Offending values quoted in assertion messages
+SAMPLES = 5
+
+
+def _column(table: pa.Table | pa.RecordBatch, column: str):
+    col = table.column(column)
+    if pa.types.is_dictionary(col.type):
+        col = pc.cast(col, col.type.value_type)
+    return col
+
+
+def _strings(table: pa.Table | pa.RecordBatch, column: str):
+    """Column as strings (non-string columns are cast, as str(v) used to)."""
+    col = _column(table, column)
+    if pa.types.is_string(col.type) or pa.types.is_large_string(col.type):
+        return col
+    return pc.cast(col, pa.string())
+
+
+def _assert_none(values, bad, message: str) -> None:
+    """Assert `bad` (a boolean mask over `values`; null = fine) is false everywhere.
+
+    Only the first SAMPLES offending values are converted to Python, for the
+    message.
+    """
+    offending = pc.filter(values, pc.fill_null(bad, False))
+    assert len(offending) == 0, f"{message}: {offending.slice(0, SAMPLES).to_pylist()}..."
+
+
+def _assert_matches(table, column: str, pattern: str, what: str) -> None:
+    values = _strings(table, column)
+    _assert_none(values, pc.invert(pc.match_substring_regex(values, pattern)),
+                 f"Column '{column}' has {what}")
 
 
 # =============================================================================
 # Date Format Validators
 # =============================================================================
 
+_YEAR = r"\d{4}"
+_QUARTER = r"\d{4}-Q[1-4]"
+_MONTH = r"\d{4}-(0[1-9]|1[0-2])"
+_WEEK = r"\d{4}-W(0[1-9]|[1-4]\d|5[0-3])"
+_DATE = r"\d{4}-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])"
+
+
 def assert_valid_year(table: pa.Table, column: str) -> None:
     """Assert all non-null values are valid years (YYYY format, 4 digits)."""
-    values = [v for v in table.column(column).to_pylist() if v is not None]
-    pattern = re.compile(r"^\d{4}$")
-    invalid = [v for v in values if not pattern.match(str(v))]
-    assert not invalid, f"Column '{column}' has invalid year values: {invalid[:5]}..."
+    _assert_matches(table, column, f"^{_YEAR}$", "invalid year values")
 
 
 def assert_valid_quarter(table: pa.Table, column: str) -> None:
     """Assert all non-null values are valid quarters (YYYY-QN format)."""
-    values = [v for v in table.column(column).to_pylist() if v is not None]
-    pattern = re.compile(r"^\d{4}-Q[1-4]$")
-    invalid = [v for v in values if not pattern.match(str(v))]
-    assert not invalid, f"Column '{column}' has invalid quarter values: {invalid[:5]}..."
+    _assert_matches(table, column, f"^{_QUARTER}$", "invalid quarter values")
 
 
 def assert_valid_month(table: pa.Table, column: str) -> None:
     """Assert all non-null values are valid months (YYYY-MM format)."""
-    values = [v for v in table.column(column).to_pylist() if v is not None]
-    pattern = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
-    invalid = [v for v in values if not pattern.match(str(v))]
-    assert not invalid, f"Column '{column}' has invalid month values: {invalid[:5]}..."
+    _assert_matches(table, column, f"^{_MONTH}$", "invalid month values")
 
 
 def assert_valid_week(table: pa.Table, column: str) -> None:
     """Assert all non-null values are valid weeks (YYYY-WNN format)."""
-    values = [v for v in table.column(column).to_pylist() if v is not None]
-    pattern = re.compile(r"^\d{4}-W(0[1-9]|[1-4]\d|5[0-3])$")
-    invalid = [v for v in values if not pattern.match(str(v))]
-    assert not invalid, f"Column '{column}' has invalid week values: {invalid[:5]}..."
+    _assert_matches(table, column, f"^{_WEEK}$", "invalid week values")
 
 
 def assert_valid_date(table: pa.Table, column: str) -> None:
     """Assert all non-null values are valid dates (YYYY-MM-DD format)."""
-    values = [v for v in table.column(column).to_pylist() if v is not None]
-    pattern = re.compile(r"^\d{4}-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])$")
-    invalid = [v for v in values if not pattern.match(str(v))]
-    assert not invalid, f"Column '{column}' has invalid date values: {invalid[:5]}..."
+    _assert_matches(table, column, f"^{_DATE}$", "invalid date values")
 
 
 def assert_valid_date_any(table: pa.Table, column: str) -> None:
     """Assert all non-null values match one of: YYYY, YYYY-QN, YYYY-MM, YYYY-WNN, YYYY-MM-DD."""
-    values = [v for v in table.column(column).to_pylist() if v is not None]
-    patterns = [
-        re.compile(r"^\d{4}$"),  # Year
-        re.compile(r"^\d{4}-Q[1-4]$"),  # Quarter
-        re.compile(r"^\d{4}-(0[1-9]|1[0-2])$"),  # Month
-        re.compile(r"^\d{4}-W(0[1-9]|[1-4]\d|5[0-3])$"),  # Week
-        re.compile(r"^\d{4}-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])$"),  # Date
-    ]
-    invalid = [v for v in values if not any(p.match(str(v)) for p in patterns)]
-    assert not invalid, f"Column '{column}' has invalid date values: {invalid[:5]}..."
+    pattern = f"^({_YEAR}|{_QUARTER}|{_MONTH}|{_WEEK}|{_DATE})$"
+    _assert_matches(table, column, pattern, "invalid date values")
 
 
 # =============================================================================
@@ -95,39 +180,47 @@ def assert_valid_date_any(table: pa.Table, column: str) -> None:
 
 def assert_max_length(table: pa.Table, column: str, max_len: int) -> None:
     """Assert all non-null string values have length <= max_len."""
-    values = [v for v in table.column(column).to_pylist() if v is not None]
-    invalid = [v for v in values if len(str(v)) > max_len]
-    assert not invalid, f"Column '{column}' has values exceeding {max_len} chars: {invalid[:5]}..."
+    values = _strings(table, column)
+    _assert_none(values, pc.greater(pc.utf8_length(values), max_len),
+                 f"Column '{column}' has values exceeding {max_len} chars")
 
 
 def assert_min_length(table: pa.Table, column: str, min_len: int) -> None:
     """Assert all non-null string values have length >= min_len."""
-    values = [v for v in table.column(column).to_pylist() if v is not None]
-    invalid = [v for v in values if len(str(v)) < min_len]
-    assert not invalid, f"Column '{column}' has values shorter than {min_len} chars: {invalid[:5]}..."
+    values = _strings(table, column)
+    _assert_none(values, pc.less(pc.utf8_length(values), min_len),
+                 f"Column '{column}' has values shorter than {min_len} chars")
 
 
 def assert_length(table: pa.Table, column: str, exact_len: int) -> None:
     """Assert all non-null string values have exactly the specified length."""
-    values = [v for v in table.column(column).to_pylist() if v is not None]
-    invalid = [v for v in values if len(str(v)) != exact_len]
-    assert not invalid, f"Column '{column}' has values not exactly {exact_len} chars: {invalid[:5]}..."
+    values = _strings(table, column)
+    _assert_none(values, pc.not_equal(pc.utf8_length(values), exact_len),
+                 f"Column '{column}' has values not exactly {exact_len} chars")
 
 
 def assert_matches_pattern(table: pa.Table, column: str, pattern: str, description: str = None) -> None:
-    """Assert all non-null values match the regex pattern."""
-    values = [v for v in table.column(column).to_pylist() if v is not None]
-    regex = re.compile(pattern)
-    invalid = [v for v in values if not regex.match(str(v))]
+    """Assert all non-null values match the regex pattern (RE2 syntax, anchored at the start)."""
     desc = description or f"pattern '{pattern}'"
-    assert not invalid, f"Column '{column}' has values not matching {desc}: {invalid[:5]}..."
+    if not pattern.startswith("^"):
+        pattern = f"^(?:{pattern})"  # re.match semantics
+    _assert_matches(table, column, pattern, f"values not matching {desc}")
 
 
 def assert_in_set(table: pa.Table, column: str, valid_values: set) -> None:
     """Assert all non-null values are in the set of valid values."""
-    values = [v for v in table.column(column).to_pylist() if v is not None]
-    invalid = [v for v in values if v not in valid_values]
-    assert not invalid, f"Column '{column}' has unexpected values: {invalid[:5]}..."
+    values = _column(table, column)
+    value_set = pa.array(list(valid_values), type=values.type)
+    _assert_none(values, pc.invert(pc.is_in(values, value_set=value_set)),
+                 f"Column '{column}' has unexpected values")
+
+
+def assert_contains(table: pa.Table, column: str, expected: set) -> None:
+    """Assert every value in `expected` occurs in the column (e.g. must-have IDs)."""
+    values = _column(table, column)
+    wanted = pa.array(sorted(expected), type=values.type)
+    missing = pc.filter(wanted, pc.invert(pc.is_in(wanted, value_set=pc.unique(values))))
+    assert len(missing) == 0, f"Column '{column}' is missing expected values: {missing.to_pylist()}"
 
 
 # =============================================================================
@@ -136,26 +229,26 @@ def assert_in_set(table: pa.Table, column: str, valid_values: set) -> None:
 
 def assert_positive(table: pa.Table, column: str, allow_zero: bool = True) -> None:
     """Assert all non-null numeric values are positive (or zero if allow_zero=True)."""
-    values = [v for v in table.column(column).to_pylist() if v is not None]
+    values = _column(table, column)
     if allow_zero:
-        invalid = [v for v in values if v < 0]
-        assert not invalid, f"Column '{column}' has negative values: {invalid[:5]}..."
+        _assert_none(values, pc.less(values, 0), f"Column '{column}' has negative values")
     else:
-        invalid = [v for v in values if v <= 0]
-        assert not invalid, f"Column '{column}' has non-positive values: {invalid[:5]}..."
+        _assert_none(values, pc.less_equal(values, 0), f"Column '{column}' has non-positive values")
 
 
 def assert_in_range(table: pa.Table, column: str, min_val: float = None, max_val: float = None) -> None:
     """Assert all non-null numeric values are within the specified range."""
-    values = [v for v in table.column(column).to_pylist() if v is not None]
-    invalid = []
-    for v in values:
-        if min_val is not None and v < min_val:
-            invalid.append(v)
-        elif max_val is not None and v > max_val:
-            invalid.append(v)
+    values = _column(table, column)
+    below = pc.less(values, min_val) if min_val is not None else None
+    above = pc.greater(values, max_val) if max_val is not None else None
+    if below is None or above is None:
+        bad = below if above is None else above
+    else:
+        bad = pc.or_(pc.fill_null(below, False), pc.fill_null(above, False))
+    if bad is None:
+        return
     range_desc = f"[{min_val}, {max_val}]"
-    assert not invalid, f"Column '{column}' has values outside range {range_desc}: {invalid[:5]}..."
+    _assert_none(values, bad, f"Column '{column}' has values outside range {range_desc}")
 
 
 def assert_percentage(table: pa.Table, column: str) -> None:
@@ -167,57 +260,193 @@ def assert_percentage(table: pa.Table, column: str) -> None:
 # Schema Validator
 # =============================================================================
 
-def validate(table: pa.Table, schema: dict) -> None:
+_FORMATS = {
+    "year": _YEAR,
+    "quarter": _QUARTER,
+    "month": _MONTH,
+    "week": _WEEK,
+    "date": _DATE,
+    "date_any": f"({_YEAR}|{_QUARTER}|{_MONTH}|{_WEEK}|{_DATE})",
+}
+
+
+def _check_columns(arrow_schema: pa.Schema, columns: dict) -> None:
+    for col, expected_type in columns.items():
+        assert col in arrow_schema.names, f"Missing column: {col}"
+        actual_type = str(arrow_schema.field(col).type)
+        assert expected_type in actual_type, (
+            f"Column '{col}': expected type containing '{expected_type}', got '{actual_type}'"
+        )
+
+
+class ValidationPlan:
+    """A validate() schema compiled into checks that run in one pass over batches.
+
+    update() evaluates every row-level check on a batch (or a whole table),
+    keeping each failed check's row count and first SAMPLES offending values;
+    finish() adds the dataset-level checks and raises a single AssertionError
+    listing every failure. See validate() for the schema keys.
+
+    Uniqueness holds within each update() — stream key-disjoint batches, as
+    for merge(). `rows`, `distinct` (per "min_distinct" column, plus any in
+    `track_distinct`) and `bounds` (seen min/max per "ranges" column) are
+    available for summaries.
+    """
+
+    def __init__(self, schema: dict, *, track_distinct=()):
+        self.schema = schema
+        self.rows = 0
+        self.distinct = {c: set() for c in [*schema.get("min_distinct", {}), *track_distinct]}
+        self.bounds: dict[str, list] = {}
+        self._contains = {c: set(v) for c, v in schema.get("contains", {}).items()}
+        self._found = {c: set() for c in self._contains}
+        self._failures: dict[str, list] = {}  # message → [rows, samples]
+        self._columns_checked = False
+        self._checks = self._compile(schema)
+
+    @staticmethod
+    def _compile(schema: dict) -> list[tuple]:
+        """(column, message, mask function, as strings) per row-level check."""
+        checks = []
+        for col, fmt in schema.get("formats", {}).items():
+            pattern = f"^{_FORMATS[fmt]}$"
+            checks.append((col, f"Column '{col}' has invalid {fmt} values",
+                           lambda v, p=pattern: pc.invert(pc.match_substring_regex(v, p)), True))
+        for col, pattern in schema.get("patterns", {}).items():
+            anchored = pattern if pattern.startswith("^") else f"^(?:{pattern})"
+            checks.append((col, f"Column '{col}' has values not matching pattern '{pattern}'",
+                           lambda v, p=anchored: pc.invert(pc.match_substring_regex(v, p)), True))
+        for col in schema.get("positive", []):
+            checks.append((col, f"Column '{col}' has non-positive values",
+                           lambda v: pc.less_equal(v, 0), False))
+        for col in schema.get("non_negative", []):
+            checks.append((col, f"Column '{col}' has negative values",
+                           lambda v: pc.less(v, 0), False))
+        for col, (lo, hi) in schema.get("ranges", {}).items():
+            def outside(v, lo=lo, hi=hi):
+                below = pc.less(v, lo) if lo is not None else None
+                above = pc.greater(v, hi) if hi is not None else None
+                if below is None or above is None:
+                    return below if above is None else above
+                return pc.or_(pc.fill_null(below, False), pc.fill_null(above, False))
+            checks.append((col, f"Column '{col}' has values outside range [{lo}, {hi}]", outside, False))
+        for col, valid in schema.get("allowed", {}).items():
+            checks.append((col, f"Column '{col}' has unexpected values",
+                           lambda v, valid=valid: pc.invert(pc.is_in(v, value_set=pa.array(list(valid), type=v.type))),
+                           False))
+        return checks
+
+    def _fail(self, message: str, rows: int, samples: list) -> None:
+        entry = self._failures.setdefault(message, [0, []])
+        entry[0] += rows
+        entry[1].extend(samples[:SAMPLES - len(entry[1])])
+
+    def update(self, batch: pa.Table | pa.RecordBatch) -> None:
+        if not self._columns_checked:
+            # Schema problems make the remaining checks meaningless — fail now
+            _check_columns(batch.schema, self.schema.get("columns", {}))
+            self._columns_checked = True
+        self.rows += len(batch)
+
+        for col in self.schema.get("not_null", []):
+            if null_count := batch.column(col).null_count:
+                self._fail(f"Column '{col}' has null values", null_count, [])
+
+        if unique := self.schema.get("unique"):
+            keys = check_keys(batch, unique)
+            if keys.duplicates:
+                what = "values" if len(keys.keys) == 1 else "combinations"
+                label = f"Column '{keys.keys[0]}' has" if len(keys.keys) == 1 else f"Columns {keys.keys} have"
+                self._fail(f"{label} duplicate {what}", keys.duplicates, keys.examples)
+
+        for col, message, bad, as_strings in self._checks:
+            values = _strings(batch, col) if as_strings else _column(batch, col)
+            offending = pc.filter(values, pc.fill_null(bad(values), False))
+            if len(offending):
+                self._fail(message, len(offending), offending.slice(0, SAMPLES).to_pylist())
+
+        for col in self.schema.get("ranges", {}):
+            seen = pc.min_max(_column(batch, col))
+            lo, hi = seen["min"].as_py(), seen["max"].as_py()
+            if lo is not None:
+                prev = self.bounds.setdefault(col, [lo, hi])
+                prev[0], prev[1] = min(prev[0], lo), max(prev[1], hi)
+
+        for col in self.distinct:
+            self.distinct[col].update(pc.unique(_column(batch, col)).to_pylist())
+
+        for col, expected in self._contains.items():
+            wanted = pa.array(sorted(expected - self._found[col]), type=_column(batch, col).type)
+            if len(wanted):
+                present = pc.filter(wanted, pc.is_in(wanted, value_set=pc.unique(_column(batch, col))))
+                self._found[col].update(present.to_pylist())
+
+    def finish(self) -> None:
+        """Run the dataset-level checks; raise AssertionError listing every failure."""
+        if min_rows := self.schema.get("min_rows"):
+            if self.rows < min_rows:
+                self._fail(f"Expected >= {min_rows} rows, got {self.rows}", 0, [])
+        if max_rows := self.schema.get("max_rows"):
+            if self.rows > max_rows:
+                self._fail(f"Expected <= {max_rows} rows, got {self.rows}", 0, [])
+        for col, n in self.schema.get("min_distinct", {}).items():
+            if len(self.distinct[col]) < n:
+                self._fail(f"Expected {n}+ distinct '{col}' values, got {len(self.distinct[col])}", 0, [])
+        for col, expected in self._contains.items():
+            if missing := expected - self._found[col]:
+                self._fail(f"Column '{col}' is missing expected values: {sorted(missing)}", 0, [])
+
+        if self._failures:
+            lines = [
+                f"{message}: {rows:,} rows, e.g. {samples}" if rows and samples
+                else f"{message}: {rows:,} rows" if rows else message
+                for message, (rows, samples) in self._failures.items()
+            ]
+            raise AssertionError("; ".join(lines))
+
+
+def validate(table: pa.Table | pa.RecordBatchReader, schema: dict):
     """Validate table against schema. Raises AssertionError on failure.
 
+    All checks are compiled into a ValidationPlan and evaluated in one pass;
+    the AssertionError lists every failed check, with up to SAMPLES
+    offending values each.
+
+    A pa.RecordBatchReader is not consumed: validate() returns a reader that
+    checks each batch as it streams and raises at its end (before a merge
+    consuming it commits). Uniqueness is then per batch.
+
     Args:
-        table: PyArrow table to validate
+        table: PyArrow table or RecordBatchReader to validate
         schema: Validation schema with optional keys:
             - columns: dict of {column_name: expected_type_substring}
             - not_null: list of column names that must not have nulls
             - unique: list of column names that form a unique key (composite if multiple)
             - min_rows: minimum expected row count
             - max_rows: maximum expected row count
+            - formats: dict of {column_name: "year" | "quarter" | "month" | "week" | "date" | "date_any"}
+            - patterns: dict of {column_name: regex} (RE2, anchored at the start)
+            - positive / non_negative: lists of numeric columns (> 0 / >= 0)
+            - ranges: dict of {column_name: (min, max)}, inclusive, None for open;
+              also for date bounds, e.g. {"date": ("2023-01-01", "2030-01-01")}
+            - allowed: dict of {column_name: set of allowed values}
+            - contains: dict of {column_name: set of values that must appear}
+            - min_distinct: dict of {column_name: minimum distinct values}
 
     Raises:
         AssertionError: If any validation fails
     """
-    # Check min/max rows
-    if min_rows := schema.get("min_rows"):
-        assert len(table) >= min_rows, f"Expected >= {min_rows} rows, got {len(table)}"
-
-    if max_rows := schema.get("max_rows"):
-        assert len(table) <= max_rows, f"Expected <= {max_rows} rows, got {len(table)}"
-
-    # Check columns exist and have correct types
-    if columns := schema.get("columns"):
-        table_columns = set(table.column_names)
-
-        for col, expected_type in columns.items():
-            assert col in table_columns, f"Missing column: {col}"
-            actual_type = str(table.schema.field(col).type)
-            assert expected_type in actual_type, (
-                f"Column '{col}': expected type containing '{expected_type}', got '{actual_type}'"
-            )
-
-    # Check not-null columns
-    if not_null := schema.get("not_null"):
-        for col in not_null:
-            null_count = table.column(col).null_count
-            assert null_count == 0, f"Column '{col}' has {null_count} null values"
-
-    # Check unique constraint (composite key support)
-    if unique := schema.get("unique"):
-        if isinstance(unique, str):
-            unique = [unique]
-
-        if len(unique) == 1:
-            values = table.column(unique[0]).to_pylist()
-            duplicates = len(values) - len(set(values))
-            assert duplicates == 0, f"Column '{unique[0]}' has {duplicates} duplicate values"
-        else:
-            # Composite key - convert columns once, then zip
-            columns_as_lists = [table.column(col).to_pylist() for col in unique]
-            rows = list(zip(*columns_as_lists))
-            duplicates = len(rows) - len(set(rows))
-            assert duplicates == 0, f"Columns {unique} have {duplicates} duplicate combinations"
+    plan = ValidationPlan(schema)
+    if isinstance(table, pa.RecordBatchReader):
+        _check_columns(table.schema, schema.get("columns", {}))
+
+        def batches():
+            for batch in table:
+                plan.update(batch)
+                yield batch
+            plan.finish()
+
+        return pa.RecordBatchReader.from_batches(table.schema, batches())
+
+    plan.update(table)
+    plan.finish()